@@ -6,9 +6,14 @@ from argparse import ArgumentParser
 
 from .backends import BACK_ENDS, RawGraphBackEnd
 from .config import Config
-from .dependency_graph import DependencyGraph
 from .frontends import FRONT_ENDS
+from .graph_cores import GRAPH_CORES
 from .middlewares import MIDDLEWARES
+from .middlewares.middleware import make_depth_action
+from .output import write_output_file, write_output_stdout
+from .pipeline import describe_plan, plan_pipeline, run_pipeline
+from .stage_cache import run_cached_pipeline
+from .watch import watch
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +41,97 @@ def configure_parser(parser: ArgumentParser):
         dest='output-file',
         required=False,
         default=None,
-        help="Location of the generated dot file (default: stdout)",
+        help='Location of the generated file, compressed if it ends with '
+             '.gz or .xz (default: stdout)',
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        dest='jobs',
+        required=False,
+        default=1,
+        type=int,
+        help='Number of parallel workers used by the front-ends (default: 1)'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        dest='cache-dir',
+        required=False,
+        default=None,
+        help='Directory where the front-ends cache the parsed files'
+    )
+    parser.add_argument(
+        '--cache-check-hash',
+        dest='cache-check-hash',
+        required=False,
+        default=False,
+        action='store_true',
+        help='Reuse the cached results of the files whose size or mtime '
+             'changed if their content hash is still the same'
+    )
+    parser.add_argument(
+        '--stage-cache',
+        dest='stage-cache',
+        required=False,
+        default=False,
+        action='store_true',
+        help='Cache the graphs of the front-end and of each middleware in '
+             'the cache directory, and start from the longest cached prefix '
+             'of the pipeline'
+    )
+    parser.add_argument(
+        '--stage-cache-size',
+        dest='stage-cache-size',
+        required=False,
+        default=1024,
+        type=int,
+        metavar='MB',
+        help='Maximum size of the stage cache, the least recently used '
+             'graphs being evicted (default: 1024)'
+    )
+    parser.add_argument(
+        '--watch',
+        dest='watch',
+        required=False,
+        default=False,
+        action='store_true',
+        help='Keep running and regenerate the output file when the source '
+             'files change'
+    )
+    parser.add_argument(
+        '--watch-interval',
+        dest='watch-interval',
+        required=False,
+        default=2.0,
+        type=float,
+        help='Seconds between two checks for changes in watch mode '
+             '(default: 2)'
+    )
+    parser.add_argument(
+        '--depth',
+        required=False,
+        type=int,
+        metavar='N',
+        action=make_depth_action(),
+        help='Number of layers of leaf or root nodes handled by the previous '
+             'middleware (default: 1)'
+    )
+    parser.add_argument(
+        '--explain-pipeline',
+        dest='explain-pipeline',
+        required=False,
+        default=False,
+        action='store_true',
+        help='Print how the middlewares will be run, and exit'
+    )
+    parser.add_argument(
+        '--graph-core',
+        dest='graph-core',
+        required=False,
+        default='networkx',
+        choices=list(GRAPH_CORES),
+        help='Implementation of the dependency graph: networkx, or compact '
+             'for less memory on large graphs (default: networkx)'
     )
 
     # TODO: See where to put this when more front-ends will be implemented
@@ -100,6 +195,12 @@ def main():
         backend.install_arg_parser(parser)
     config = Config(parser)
     logger.debug('Configuration:\n%s', config)
+    if config['watch'] and not config['output-file']:
+        parser.error('--watch requires an output file.')
+    if config['stage-cache'] and not config['cache-dir']:
+        parser.error('--stage-cache requires --cache-dir.')
+    if config['stage-cache'] and config['watch']:
+        parser.error('--stage-cache cannot be used with --watch.')
 
     random.seed(config['random-seed'])
 
@@ -146,34 +247,33 @@ def main():
     assert isinstance(middlewares, list)
     assert backend is not None
 
-    # Get a dependency graph from the frontend
-    dep_graph = frontend.get_dependency_graph()
+    # Fuse the middlewares which can run in the same pass
+    plan = plan_pipeline(middlewares)
+    if config['explain-pipeline']:
+        print('\n'.join(describe_plan(plan)))
+        return
+    if len(plan) < len(middlewares):
+        logger.info('Pipeline plan: \n%s', '\n'.join(describe_plan(plan)))
 
-    # Transform it using middlewares
-    for middleware in middlewares:
-        dep_graph = middleware.transform(dep_graph)
+    if config['watch']:
+        watch(frontend, plan, backend, config)
+        return
 
-    # TODO: This should go somewhere else
-    # Fix clusters
-    if isinstance(dep_graph, DependencyGraph):
-        for cluster in dep_graph.clusters:
-            removed_nodes = set()
-            for node in cluster:
-                if node not in dep_graph.nodes:
-                    removed_nodes.add(node)
-            cluster.remove_nodes_from(removed_nodes)
+    if config['stage-cache']:
+        output = run_cached_pipeline(frontend, plan, backend, config)
+    else:
+        # Get a dependency graph from the frontend
+        dep_graph = frontend.get_dependency_graph()
 
-    # Get the output from the backend
-    output = backend.convert(dep_graph)
+        # Transform it using middlewares, and get the output from the backend
+        output = run_pipeline(dep_graph, plan, backend)
 
     # Write the output to stdout or to a file
     if config['output-file']:
-        with open(config['output'], 'w') as dot_file:
-            dot_file.writelines(output)
+        write_output_file(output, config['output-file'])
     else:
         try:
-            for line in output:
-                print(line, file=sys.stdout)
+            write_output_stdout(output)
         except BrokenPipeError:
             exit(0)
 
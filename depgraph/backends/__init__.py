@@ -1,9 +1,21 @@
+from .csv_table import CsvBackEnd
 from .dot import DotBackEnd
+from .graphml import GraphMLBackEnd
+from .layered_svg import LayeredSvgBackEnd
+from .ndjson import NdjsonBackEnd
 from .no_backend import NoBackEnd
 from .raw_graph import RawGraphBackEnd
+from .snapshot import SnapshotBackEnd
+from .svg import SvgBackEnd
 
 BACK_ENDS = [
     NoBackEnd,
     RawGraphBackEnd,
     DotBackEnd,
+    SnapshotBackEnd,
+    NdjsonBackEnd,
+    CsvBackEnd,
+    GraphMLBackEnd,
+    SvgBackEnd,
+    LayeredSvgBackEnd,
 ]
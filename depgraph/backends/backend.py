@@ -1,9 +1,10 @@
 import abc
 from argparse import ArgumentParser
-from typing import Iterable
+from typing import Iterable, Iterator, List, Tuple
 
 from ..config import make_pipeline_action
 from ..dependency_graph import DependencyGraph
+from ..output import chunks_of_lines
 
 
 class BackEnd(metaclass=abc.ABCMeta):
@@ -19,6 +20,28 @@ class BackEnd(metaclass=abc.ABCMeta):
     def convert(self, dep_graph: DependencyGraph) -> Iterable[str]:
         raise NotImplementedError()
 
+    def convert_chunks(self, dep_graph: DependencyGraph) -> Iterable[str]:
+        # The output as chunks of lines (see output.py). The backends which
+        # can build whole chunks at once may override it.
+        return chunks_of_lines(self.convert(dep_graph))
+
+
+# Attributes of the nodes written by the table-like backends (NDJSON, CSV,
+# GraphML), with the names of the clusters of each node
+NODE_FIELDS = ('long_name', 'pretty_name', 'color')
+
+
+def node_records(dep_graph: DependencyGraph) \
+        -> Iterator[Tuple[str, List, List[str]]]:
+    # (node id, values of NODE_FIELDS or None, cluster names) of each node.
+    # The clusters are scanned for each node instead of indexing them, so
+    # that the backends use constant memory on top of the graph.
+    clusters = list(dep_graph.clusters)
+    for node_id, node_attrs in dep_graph.nodes.items():
+        yield (node_id, [node_attrs.get(field) for field in NODE_FIELDS],
+               [str(cluster.name) for cluster in clusters
+                if node_id in cluster])
+
 
 def make_backend_action(action_class, **kwargs):
     return make_pipeline_action('backend', action_class, **kwargs)
@@ -0,0 +1,65 @@
+import csv
+import io
+import logging
+from argparse import ArgumentParser
+from typing import Iterable
+
+from .backend import BackEnd, NODE_FIELDS, make_backend_action, node_records
+from ..config import Config
+from ..dependency_graph import DependencyGraph
+
+logger = logging.getLogger(__name__)
+
+# CSV edge list (`source,target`), or with `--csv-table nodes`, the table of
+# the nodes (`id,long_name,pretty_name,color,clusters`, the clusters being
+# separated by CLUSTER_SEPARATOR), e.g. for the two imports of Gephi.
+
+CLUSTER_SEPARATOR = ';'
+
+
+class CsvBackEnd(BackEnd):
+    def __init__(self, config: Config, _args):
+        super().__init__('CSV %s' % config['csv-table'])
+        self.config = config
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        parser.add_argument(
+            '--as-csv',
+            required=False,
+            action=make_backend_action(CsvBackEnd)
+        )
+        parser.add_argument(
+            '--csv-table',
+            dest='csv-table',
+            required=False,
+            default='edges',
+            choices=['edges', 'nodes'],
+            help='Table written by --as-csv (default: edges)'
+        )
+
+    def convert(self, dep_graph: DependencyGraph) -> Iterable[str]:
+        logger.info("Exporting as CSV file...")
+
+        # The rows are formatted one at a time, without their line terminator
+        # (the fields with new lines are quoted)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+
+        def row(values) -> str:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(values)
+            return buffer.getvalue()[:-1]
+
+        if self.config['csv-table'] == 'nodes':
+            yield row(('id',) + NODE_FIELDS + ('clusters',))
+            for node_id, values, clusters in node_records(dep_graph):
+                yield row([node_id] + values
+                          + [CLUSTER_SEPARATOR.join(clusters)])
+        else:
+            yield row(('source', 'target'))
+            for node_id, dependencies in dep_graph.adjacency():
+                for dependency_id in dependencies:
+                    yield row((node_id, dependency_id))
+        logger.info("Done.")
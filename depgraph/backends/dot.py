@@ -1,14 +1,70 @@
 import logging
+import random
 from argparse import ArgumentParser
-from typing import Iterable
+from typing import Iterable, Iterator, List, Tuple
 
 from .backend import BackEnd, make_backend_action
 from ..config import Config
 from ..dependency_graph import DependencyGraph
-from ..utils import random_hex_color, OrderedSet
+from ..utils import parallel_imap, paused_gc, random_hex_color
 
 logger = logging.getLogger(__name__)
 
+# The nodes and edges are formatted by batches of BATCH_SIZE nodes, each
+# batch giving one chunk of the output (see output.py). With --dot-jobs, the
+# batches are formatted by worker processes, the output keeping the order of
+# the batches. The random colors are drawn beforehand, in the same order as
+# in the sequential version, so the output doesn't depend on the workers.
+
+BATCH_SIZE = 10000
+
+# Number of nodes without "pretty_name" listed in the logs
+MAX_REPORTED = 5
+
+
+def escape(value) -> str:
+    # Content of a double-quoted DOT string
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+# The batches hold the index of each node in the graph, which gives its DOT
+# id (`n<index>`), so they are quick to send to the workers
+
+
+def _format_nodes(batch: List[Tuple[int, str, str]]) -> str:
+    # (index, label, color or None) of each node
+    parts = []
+    for index, label, color in batch:
+        if color is None:
+            parts.append('n%d[label="%s"]\n' % (index, escape(label)))
+        else:
+            parts.append('n%d[label="%s" color="%s" style="filled"]\n'
+                         % (index, escape(label), escape(color)))
+    return ''.join(parts)
+
+
+def _format_edges(batch: List[Tuple[int, Tuple[int, ...], int]]) -> str:
+    # (index, indexes of the dependencies, 24-bit RGB edge color) of each node
+    parts = []
+    for index, dependencies, rgb in batch:
+        targets = '  n%s\n' % '\n  n'.join(map(str, dependencies)) \
+            if dependencies else ''
+        parts.append('n%d -> {\n%s}[color="#%06X"]\n'
+                     % (index, targets, rgb))
+    return ''.join(parts)
+
+
+def _batches(items: Iterable) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 
 class DotBackEnd(BackEnd):
     def __init__(self, config: Config, _args):
@@ -29,73 +85,75 @@ class DotBackEnd(BackEnd):
             default=False,
             action="store_true",
         )
+        parser.add_argument(
+            '--dot-jobs',
+            dest='dot-jobs',
+            required=False,
+            default=1,
+            type=int,
+            help='Number of processes formatting the DOT output (default: 1)'
+        )
 
     def convert(self, dep_graph: DependencyGraph) -> Iterable[str]:
-        logger.info("Exporting as DOT file...")
+        for chunk in self.convert_chunks(dep_graph):
+            yield from chunk[:-1].split('\n')
 
-        yield 'digraph G {'
+    def convert_chunks(self, dep_graph: DependencyGraph) -> Iterable[str]:
+        with paused_gc():
+            yield from self._chunks(dep_graph)
 
-        yield 'graph [compound=true];'
-        yield 'node [shape=box];'
+    def _chunks(self, dep_graph: DependencyGraph) -> Iterator[str]:
+        logger.info("Exporting as DOT file...")
+        jobs = self.config['dot-jobs']
 
+        header = ['digraph G {', 'graph [compound=true];', 'node [shape=box];']
         if self.config['dot-horizontal']:
-            yield 'rankdir=LR'
-
-        yield ''
-        yield '# Nodes'
-        yield ''
-
-        node_id_mapping = dict()
-        for i, (node_id, node_attrs) in enumerate(dep_graph.nodes.items()):
-            dot_id = 'n{}'.format(i)
-            node_id_mapping[node_id] = dot_id
-            try:
-                pretty_name = node_attrs['pretty_name']
-            except KeyError:
-                pretty_name = node_id
-                logger.warn('No "pretty_name" for node "%s".', node_id)
-
-            attrs = {'label': pretty_name}
-
-            if 'color' in node_attrs:
-                attrs['color'] = node_attrs['color']
-                attrs['style'] = 'filled'
-
-            yield '{id}[{attrs}]'.format(
-                id=dot_id,
-                attrs=' '.join('%s="%s"' % kv for kv in attrs.items())
-            )
-
-        yield ''
-        yield '# Edges'
-        yield ''
-
-        for node_id in dep_graph.nodes:
-            from_id = node_id_mapping[node_id]
-            edge_color = random_hex_color()
-            yield '%s -> {' % from_id
-            for dependency_id in dep_graph.adj[node_id]:
-                to_id = node_id_mapping[dependency_id]
-                yield '  %s' % to_id
-
-            yield '}[color="%s"]' % edge_color
-
-        yield ''
-        yield '# Clusters'
-        yield ''
-
+            header.append('rankdir=LR')
+        header.extend(['', '# Nodes', ''])
+        yield ''.join('%s\n' % line for line in header)
+
+        node_indexes = dict()
+        missing_pretty_names = []
+
+        def nodes():
+            for i, (node_id, node_attrs) in enumerate(
+                    dep_graph.nodes.items()):
+                node_indexes[node_id] = i
+                try:
+                    pretty_name = node_attrs['pretty_name']
+                except KeyError:
+                    pretty_name = node_id
+                    missing_pretty_names.append(node_id)
+                yield i, pretty_name, node_attrs.get('color')
+
+        yield from parallel_imap(_format_nodes, _batches(nodes()), jobs)
+
+        if missing_pretty_names:
+            logger.warning('No "pretty_name" for %d nodes: %s%s',
+                           len(missing_pretty_names),
+                           ', '.join('"%s"' % node_id for node_id
+                                     in missing_pretty_names[:MAX_REPORTED]),
+                           ', ...' if len(missing_pretty_names)
+                           > MAX_REPORTED else '')
+
+        yield '\n# Edges\n\n'
+
+        def edges():
+            index_of = node_indexes.__getitem__
+            for i, (_, dependencies) in enumerate(dep_graph.adjacency()):
+                yield i, tuple(map(index_of, dependencies)), \
+                    random.getrandbits(24)
+
+        yield from parallel_imap(_format_edges, _batches(edges()), jobs)
+
+        parts = ['\n# Clusters\n\n']
         for i, cluster in enumerate(dep_graph.clusters):
-            yield 'subgraph cluster_%d {' % i
-            yield '  label="%s"' % cluster.name
-
-            cluster_color = random_hex_color()
-            yield '  color="%s";' % cluster_color
-            yield ''
-
-            for node_id in cluster.nodes:
-                yield '  "%s"' % node_id_mapping[node_id]
-
-            yield '}'
-
-        yield '}'
+            parts.append('subgraph cluster_%d {\n' % i)
+            parts.append('  label="%s"\n' % escape(cluster.name))
+            parts.append('  color="%s";\n\n' % random_hex_color())
+            parts.extend('  "n%d"\n' % node_indexes[node_id]
+                         for node_id in cluster.nodes)
+            parts.append('}\n')
+        parts.append('}\n')
+        yield ''.join(parts)
         logger.info("Done.")
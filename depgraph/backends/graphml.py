@@ -0,0 +1,71 @@
+import logging
+import re
+from argparse import ArgumentParser
+from typing import Iterable
+from xml.sax.saxutils import escape, quoteattr
+
+from .backend import BackEnd, NODE_FIELDS, make_backend_action, node_records
+from ..config import Config
+from ..dependency_graph import DependencyGraph
+
+logger = logging.getLogger(__name__)
+
+# GraphML, with the attributes of NODE_FIELDS and the clusters of each node
+# (separated by CLUSTER_SEPARATOR) as string attributes of the nodes
+
+CLUSTER_SEPARATOR = ';'
+
+# Characters which XML 1.0 does not allow
+_invalid_xml_regex = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def xml_text(value) -> str:
+    return escape(_invalid_xml_regex.sub('\ufffd', str(value)))
+
+
+def xml_attr(value) -> str:
+    return quoteattr(_invalid_xml_regex.sub('\ufffd', str(value)))
+
+
+class GraphMLBackEnd(BackEnd):
+    def __init__(self, config: Config, _args):
+        super().__init__('GraphML')
+        self.config = config
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        parser.add_argument(
+            '--as-graphml',
+            required=False,
+            action=make_backend_action(GraphMLBackEnd)
+        )
+
+    def convert(self, dep_graph: DependencyGraph) -> Iterable[str]:
+        logger.info("Exporting as GraphML file...")
+
+        yield '<?xml version="1.0" encoding="UTF-8"?>'
+        yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">'
+        for field in NODE_FIELDS + ('clusters',):
+            yield ('  <key id=%s for="node" attr.name=%s '
+                   'attr.type="string"/>' % (xml_attr(field), xml_attr(field)))
+        yield '  <graph id="G" edgedefault="directed">'
+
+        for node_id, values, clusters in node_records(dep_graph):
+            data = ['<data key=%s>%s</data>' % (xml_attr(field), xml_text(value))
+                    for field, value in zip(NODE_FIELDS, values)
+                    if value is not None]
+            if clusters:
+                data.append('<data key="clusters">%s</data>'
+                            % xml_text(CLUSTER_SEPARATOR.join(clusters)))
+            yield '    <node id=%s>%s</node>' % (xml_attr(node_id),
+                                                 ''.join(data))
+
+        for node_id, dependencies in dep_graph.adjacency():
+            source = xml_attr(node_id)
+            for dependency_id in dependencies:
+                yield '    <edge source=%s target=%s/>' % (
+                    source, xml_attr(dependency_id))
+
+        yield '  </graph>'
+        yield '</graphml>'
+        logger.info("Done.")
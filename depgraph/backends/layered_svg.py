@@ -0,0 +1,139 @@
+import logging
+import time
+from argparse import ArgumentParser
+from typing import Iterable
+
+from .backend import BackEnd, make_backend_action
+from .graphml import xml_attr, xml_text
+from ..config import Config
+from ..dependency_graph import DependencyGraph
+from ..layout import NODE_HEIGHT, layered_layout
+
+logger = logging.getLogger(__name__)
+
+# SVG drawing of the layered layout of layout.py, without Graphviz. The
+# dependencies are drawn below the nodes which depend on them, the clusters
+# as boxes around their nodes (which may cover other nodes, since the layers
+# are not split by cluster), and the highlighted nodes filled with their
+# color.
+
+# Labels longer than that are cut
+MAX_LABEL = 60
+
+CLUSTER_MARGIN = 8
+
+STYLE = (
+    'rect.n{fill:#fff;stroke:#333}'
+    'rect.c{fill:#4060c0;fill-opacity:.08;stroke:#4060c0;stroke-opacity:.5}'
+    'text{font:12px sans-serif;text-anchor:middle;dominant-baseline:central}'
+    'text.c{font-weight:bold;text-anchor:start;dominant-baseline:auto;'
+    'fill:#4060c0}'
+    'path{fill:none;stroke:#555;stroke-opacity:.6;marker-end:url(#arrow)}'
+)
+
+
+def _label(node_attrs, node_id) -> str:
+    label = str(node_attrs.get('pretty_name', node_id))
+    if len(label) > MAX_LABEL:
+        label = label[:MAX_LABEL - 1] + '…'
+    return label
+
+
+class LayeredSvgBackEnd(BackEnd):
+    def __init__(self, config: Config, _args):
+        super().__init__('Layered SVG')
+        self.config = config
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        parser.add_argument(
+            '--as-layered-svg',
+            required=False,
+            action=make_backend_action(LayeredSvgBackEnd)
+        )
+        parser.add_argument(
+            '--layout-sweeps',
+            dest='layout-sweeps',
+            required=False,
+            default=8,
+            type=int,
+            metavar='N',
+            help='Number of crossing reduction sweeps of --as-layered-svg '
+                 '(default: 8)'
+        )
+
+    def convert(self, dep_graph: DependencyGraph) -> Iterable[str]:
+        logger.info("Laying out %d nodes...", len(dep_graph.nodes))
+        start = time.perf_counter()
+        labels = [_label(node_attrs, node_id)
+                  for node_id, node_attrs in dep_graph.nodes.items()]
+        layout = layered_layout(dep_graph, labels,
+                                self.config['layout-sweeps'])
+        logger.info('Laid out in %d layers in %.2fs.',
+                    int(layout.rank.max()) + 1 if len(labels) else 0,
+                    time.perf_counter() - start)
+
+        index = {node: i for i, node in enumerate(layout.names)}
+        x, y, widths = layout.x.tolist(), layout.y.tolist(), \
+            layout.widths.tolist()
+        half_height = NODE_HEIGHT / 2
+
+        yield '<?xml version="1.0" encoding="UTF-8" standalone="no"?>'
+        yield ('<svg width="%.0fpt" height="%.0fpt" viewBox="0 0 %.0f %.0f" '
+               'xmlns="http://www.w3.org/2000/svg">'
+               % (layout.width, layout.height, layout.width, layout.height))
+        yield '<style>%s</style>' % STYLE
+        yield ('<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" '
+               'refY="5" markerWidth="8" markerHeight="8" '
+               'orient="auto-start-reverse"><path d="M0,0L10,5L0,10z" '
+               'style="fill:#555;stroke:none;marker-end:none"/></marker>'
+               '</defs>')
+
+        yield '<g class="clusters">'
+        for cluster in dep_graph.clusters:
+            members = [index[node] for node in cluster.nodes if node in index]
+            if not members:
+                continue
+            left = min(x[i] - widths[i] / 2 for i in members) \
+                - CLUSTER_MARGIN
+            right = max(x[i] + widths[i] / 2 for i in members) \
+                + CLUSTER_MARGIN
+            top = min(y[i] for i in members) - half_height \
+                - 2 * CLUSTER_MARGIN
+            bottom = max(y[i] for i in members) + half_height \
+                + CLUSTER_MARGIN
+            yield ('<rect class="c" x="%.1f" y="%.1f" width="%.1f" '
+                   'height="%.1f"/><text class="c" x="%.1f" y="%.1f">%s'
+                   '</text>' % (left, top, right - left, bottom - top,
+                                left + 4, top + 12, xml_text(cluster.name)))
+        yield '</g>'
+
+        yield '<g class="edges">'
+        for i, (_, successors) in enumerate(dep_graph.adjacency()):
+            for successor in successors:
+                j = index[successor]
+                if i == j:
+                    continue
+                # From the bottom of the node to the top of its dependency,
+                # or the other way around for the edges going up
+                direction = 1 if y[j] > y[i] else -1
+                y1 = y[i] + direction * half_height
+                y2 = y[j] - direction * half_height
+                middle = (y1 + y2) / 2
+                yield ('<path d="M%.1f,%.1fC%.1f,%.1f %.1f,%.1f %.1f,%.1f"/>'
+                       % (x[i], y1, x[i], middle, x[j], middle, x[j], y2))
+        yield '</g>'
+
+        yield '<g class="nodes">'
+        for i, (node_id, node_attrs) in enumerate(dep_graph.nodes.items()):
+            color = node_attrs.get('color')
+            yield ('<g><title>%s</title><rect class="n" x="%.1f" y="%.1f" '
+                   'width="%.1f" height="%d" rx="3"%s/><text x="%.1f" '
+                   'y="%.1f">%s</text></g>'
+                   % (xml_text(node_id), x[i] - widths[i] / 2,
+                      y[i] - half_height, widths[i], NODE_HEIGHT,
+                      '' if color is None
+                      else ' style=%s' % xml_attr('fill:%s' % color),
+                      x[i], y[i], xml_text(labels[i])))
+        yield '</g>'
+        yield '</svg>'
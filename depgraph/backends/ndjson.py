@@ -0,0 +1,46 @@
+import json
+import logging
+from argparse import ArgumentParser
+from typing import Iterable
+
+from .backend import BackEnd, NODE_FIELDS, make_backend_action, node_records
+from ..config import Config
+from ..dependency_graph import DependencyGraph
+
+logger = logging.getLogger(__name__)
+
+# One JSON object per line: the nodes first, as
+#   {"type": "node", "id": ..., "long_name": ..., "pretty_name": ...,
+#    "color": ..., "clusters": [...]}
+# (null for the missing attributes), then the edges, as
+#   {"type": "edge", "source": ..., "target": ...}
+
+
+class NdjsonBackEnd(BackEnd):
+    def __init__(self, config: Config, _args):
+        super().__init__('NDJSON')
+        self.config = config
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        parser.add_argument(
+            '--as-ndjson',
+            required=False,
+            action=make_backend_action(NdjsonBackEnd)
+        )
+
+    def convert(self, dep_graph: DependencyGraph) -> Iterable[str]:
+        logger.info("Exporting as NDJSON file...")
+        encode = json.JSONEncoder(ensure_ascii=False, default=str).encode
+
+        for node_id, values, clusters in node_records(dep_graph):
+            record = {'type': 'node', 'id': node_id}
+            record.update(zip(NODE_FIELDS, values))
+            record['clusters'] = clusters
+            yield encode(record)
+
+        for node_id, dependencies in dep_graph.adjacency():
+            for dependency_id in dependencies:
+                yield encode({'type': 'edge', 'source': node_id,
+                              'target': dependency_id})
+        logger.info("Done.")
@@ -0,0 +1,35 @@
+import logging
+from argparse import ArgumentParser
+from typing import Iterable
+
+from .backend import BackEnd, make_backend_action
+from ..config import Config
+from ..dependency_graph import DependencyGraph
+from ..snapshot import write_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotBackEnd(BackEnd):
+    def __init__(self, config: Config, _args):
+        super().__init__('Binary snapshot')
+        self.config = config
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        parser.add_argument(
+            '--as-snapshot',
+            required=False,
+            action=make_backend_action(SnapshotBackEnd),
+            help='Write the graph as a binary snapshot, which --from-snapshot '
+                 'reads back'
+        )
+
+    def convert(self, dep_graph: DependencyGraph) -> Iterable[str]:
+        raise NotImplementedError('The snapshots are binary, see '
+                                  'convert_chunks')
+
+    def convert_chunks(self, dep_graph: DependencyGraph) -> Iterable[bytes]:
+        logger.info("Exporting as binary snapshot...")
+        yield from write_snapshot(dep_graph)
+        logger.info("Done.")
@@ -0,0 +1,329 @@
+import logging
+import math
+import re
+import shutil
+import subprocess
+import time
+from argparse import ArgumentParser
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+
+from .backend import BackEnd, make_backend_action
+from .dot import escape
+from ..config import Config
+from ..dependency_graph import DependencyGraph
+from ..utils import parallel_map
+
+logger = logging.getLogger(__name__)
+
+# Rendering of large graphs with Graphviz: instead of one layout of the whole
+# graph, the weakly connected components are laid out separately, by
+# several Graphviz processes at once, and their drawings are packed into one
+# SVG. With --svg-split-clusters, each cluster is laid out on its own too,
+# and the edges between the clusters and the rest of the graph are dropped.
+#
+# The components are laid out from the largest one, so that the longest
+# layouts start first. Each drawing becomes a nested <svg> element of the
+# result, placed by a shelf packing: the drawings are sorted by height, and
+# put side by side in rows about as wide as the result is high.
+
+# Number of slowest layouts listed in the logs
+MAX_REPORTED = 10
+
+# Space between the drawings, in points
+MARGIN = 20
+
+_svg_open_regex = re.compile(r'<svg\b[^>]*>')
+_size_regex = re.compile(r'\b(width|height|viewBox)="([^"]*)"')
+_id_regex = re.compile(r'\bid="')
+
+
+class _Unit:
+    # Part of the graph laid out on its own
+    def __init__(self, nodes: List, title=None):
+        self.nodes = nodes
+        self.title = title
+
+
+def layout_units(dep_graph: DependencyGraph, split_clusters=False) \
+        -> List[_Unit]:
+    # The weakly connected components, in the order of their first node.
+    # With `split_clusters`, the nodes of each cluster (the first one of
+    # the node) form one unit, and only the edges between the nodes out of
+    # the clusters join the components.
+    group = dict()
+    titles = []
+    if split_clusters:
+        for i, cluster in enumerate(dep_graph.clusters):
+            titles.append(str(cluster.name))
+            for node in cluster.nodes:
+                group.setdefault(node, i)
+
+    parent = {node: node for node in dep_graph.nodes}
+
+    def find(node):
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def union(u, v):
+        u, v = find(u), find(v)
+        if u != v:
+            parent[v] = u
+
+    firsts = dict()
+    for node, i in group.items():
+        union(firsts.setdefault(i, node), node)
+    for u, successors in dep_graph.adjacency():
+        if u in group:
+            continue
+        for v in successors:
+            if v not in group:
+                union(u, v)
+
+    units = OrderedDict()
+    for node in dep_graph.nodes:
+        root = find(node)
+        unit = units.get(root)
+        if unit is None:
+            i = group.get(node)
+            unit = units[root] = _Unit([], None if i is None else titles[i])
+        unit.nodes.append(node)
+    return list(units.values())
+
+
+def unit_dot(dep_graph: DependencyGraph, unit: _Unit, horizontal=False,
+             clusters=True) -> Tuple[str, int]:
+    # DOT source of the unit, and its number of edges
+    index = {node: i for i, node in enumerate(unit.nodes)}
+    lines = ['digraph G {', 'graph [compound=true];', 'node [shape=box];']
+    if horizontal:
+        lines.append('rankdir=LR')
+    if unit.title is not None:
+        lines.append('label="%s"' % escape(unit.title))
+    for node, i in index.items():
+        attrs = dep_graph.nodes[node]
+        label = escape(attrs.get('pretty_name', node))
+        if 'color' in attrs:
+            lines.append('n%d[label="%s" color="%s" style="filled"]'
+                         % (i, label, escape(attrs['color'])))
+        else:
+            lines.append('n%d[label="%s"]' % (i, label))
+    n_edges = 0
+    for node, i in index.items():
+        for dependency in dep_graph.succ[node]:
+            j = index.get(dependency)
+            if j is not None:
+                lines.append('n%d -> n%d' % (i, j))
+                n_edges += 1
+    if clusters:
+        for k, cluster in enumerate(dep_graph.clusters):
+            members = [index[node] for node in cluster.nodes if node in index]
+            if members:
+                lines.append('subgraph cluster_%d {' % k)
+                lines.append('  label="%s"' % escape(cluster.name))
+                lines.extend('  n%d' % i for i in members)
+                lines.append('}')
+    lines.append('}')
+    return '\n'.join(lines), n_edges
+
+
+def _layout(job: Tuple[str, str]) -> Tuple[str, str, float]:
+    # (SVG or None, error, seconds) of a Graphviz run
+    program, source = job
+    start = time.perf_counter()
+    try:
+        result = subprocess.run([program, '-Tsvg'], input=source.encode(
+            'utf-8'), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        return None, str(e), time.perf_counter() - start
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        return None, result.stderr.decode('utf-8', 'replace').strip(), \
+            seconds
+    return result.stdout.decode('utf-8'), '', seconds
+
+
+def _points(length: str) -> float:
+    match = re.match(r'\s*([0-9.]+)\s*(pt|px)?', length)
+    if not match:
+        raise ValueError('Unsupported SVG length "%s"' % length)
+    return float(match.group(1))
+
+
+class _Drawing:
+    # SVG of a unit, without its XML prolog, as a nested <svg> element
+    def __init__(self, svg: str, prefix: str):
+        tag = _svg_open_regex.search(svg)
+        if tag is None:
+            raise ValueError('No <svg> element in the Graphviz output')
+        attrs = dict(_size_regex.findall(tag.group(0)))
+        self.width = _points(attrs['width'])
+        self.height = _points(attrs['height'])
+        self.view_box = attrs.get('viewBox', '0 0 %g %g' % (self.width,
+                                                              self.height))
+        end = svg.rindex('</svg>')
+        # The ids of the drawings must stay unique once packed together
+        self.body = _id_regex.sub('id="%s' % prefix, svg[tag.end():end])
+
+    def element(self, x: float, y: float) -> str:
+        return ('<svg x="%g" y="%g" width="%g" height="%g" viewBox="%s">%s'
+                '</svg>\n' % (x, y, self.width, self.height, self.view_box,
+                              self.body))
+
+
+def pack(sizes: List[Tuple[float, float]], margin=MARGIN) \
+        -> Tuple[List[Tuple[float, float]], float, float]:
+    # Shelf packing: (x, y) of each rectangle, and the size of the result
+    if not sizes:
+        return [], 0, 0
+    area = sum((w + margin) * (h + margin) for w, h in sizes)
+    row_width = max(max(w for w, _ in sizes), math.sqrt(area))
+    positions = [None] * len(sizes)
+    x = y = shelf_height = width = 0
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i][1]):
+        w, h = sizes[i]
+        if x > 0 and x + w > row_width:
+            y += shelf_height + margin
+            x = shelf_height = 0
+        positions[i] = (x, y)
+        width = max(width, x + w)
+        x += w + margin
+        shelf_height = max(shelf_height, h)
+    return positions, width, y + shelf_height
+
+
+class SvgBackEnd(BackEnd):
+    def __init__(self, config: Config, _args):
+        super().__init__('SVG rendered by Graphviz')
+        self.config = config
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        parser.add_argument(
+            '--as-svg',
+            required=False,
+            action=make_backend_action(SvgBackEnd)
+        )
+        parser.add_argument(
+            '--svg-program',
+            dest='svg-program',
+            required=False,
+            default='dot',
+            help='Graphviz layout program of --as-svg (default: dot)'
+        )
+        parser.add_argument(
+            '--svg-jobs',
+            dest='svg-jobs',
+            required=False,
+            default=1,
+            type=int,
+            help='Number of Graphviz processes run at once (default: 1)'
+        )
+        parser.add_argument(
+            '--svg-min-nodes',
+            dest='svg-min-nodes',
+            required=False,
+            default=2,
+            type=int,
+            metavar='N',
+            help='Skip the components of fewer than N nodes (default: 2)'
+        )
+        parser.add_argument(
+            '--svg-split-clusters',
+            dest='svg-split-clusters',
+            required=False,
+            default=False,
+            action='store_true',
+            help='Lay out each cluster on its own, without the edges '
+                 'between the clusters'
+        )
+
+    def convert(self, dep_graph: DependencyGraph) -> Iterable[str]:
+        for chunk in self.convert_chunks(dep_graph):
+            yield from chunk[:-1].split('\n')
+
+    def convert_chunks(self, dep_graph: DependencyGraph) -> Iterable[str]:
+        program = self.config['svg-program']
+        if shutil.which(program) is None:
+            logger.error('Cannot find the Graphviz program "%s" (see '
+                         '--svg-program).', program)
+            exit(1)
+        split_clusters = self.config['svg-split-clusters']
+        min_nodes = self.config['svg-min-nodes']
+        jobs = self.config['svg-jobs']
+
+        units = layout_units(dep_graph, split_clusters)
+        skipped = [unit for unit in units if len(unit.nodes) < min_nodes]
+        units = [unit for unit in units if len(unit.nodes) >= min_nodes]
+        if skipped:
+            logger.info('Skipped %d components of fewer than %d nodes (%d '
+                        'nodes).', len(skipped), min_nodes,
+                        sum(len(unit.nodes) for unit in skipped))
+        units.sort(key=lambda unit: len(unit.nodes), reverse=True)
+
+        sources = []
+        n_edges = []
+        for unit in units:
+            source, edges = unit_dot(dep_graph, unit,
+                                     self.config['dot-horizontal'],
+                                     clusters=not split_clusters)
+            sources.append(source)
+            n_edges.append(edges)
+        if split_clusters:
+            dropped = dep_graph.number_of_edges() - sum(n_edges)
+            if dropped:
+                logger.info('Dropped %d edges between the clusters.', dropped)
+
+        # The layouts run in Graphviz processes, so threads are enough here
+        logger.info('Laying out %d components with %d processes...',
+                    len(units), jobs)
+        start = time.perf_counter()
+        results = parallel_map(_layout, [(program, source)
+                                         for source in sources], jobs)
+        elapsed = time.perf_counter() - start
+
+        drawings = []
+        timings = []
+        for i, (unit, (svg, error, seconds)) in enumerate(zip(units,
+                                                              results)):
+            try:
+                if svg is None:
+                    raise ValueError(error)
+                drawings.append(_Drawing(svg, 'c%d_' % i))
+            except ValueError as e:
+                logger.error('Graphviz failed on the component of "%s": %s',
+                             unit.nodes[0], e)
+                exit(1)
+            timings.append((seconds, unit, n_edges[i]))
+            logger.debug('Laid out %d nodes and %d edges in %.2fs.',
+                         len(unit.nodes), n_edges[i], seconds)
+        self._report(timings, elapsed, jobs)
+
+        positions, width, height = pack([(d.width, d.height)
+                                         for d in drawings])
+        yield ('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+               '<svg width="%gpt" height="%gpt" viewBox="0 0 %g %g" '
+               'xmlns="http://www.w3.org/2000/svg" '
+               'xmlns:xlink="http://www.w3.org/1999/xlink">\n'
+               % (width, height, width, height))
+        for drawing, (x, y) in zip(drawings, positions):
+            yield drawing.element(x, y)
+        yield '</svg>\n'
+
+    @staticmethod
+    def _report(timings: List[Tuple[float, _Unit, int]], elapsed: float,
+                jobs: int):
+        total = sum(seconds for seconds, _, _ in timings)
+        logger.info('Laid out %d components in %.2fs (%.2fs of layouts on '
+                    '%d processes).', len(timings), elapsed, total, jobs)
+        for seconds, unit, edges in sorted(timings, key=lambda t: t[0],
+                                           reverse=True)[:MAX_REPORTED]:
+            logger.info(' - %.2fs: %s of %d nodes and %d edges',
+                        seconds, 'cluster "%s"' % unit.title
+                        if unit.title is not None else
+                        'component of "%s"' % unit.nodes[0],
+                        len(unit.nodes), edges)
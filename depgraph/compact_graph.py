@@ -0,0 +1,478 @@
+import logging
+from array import array
+from collections.abc import Mapping, MutableMapping
+from typing import Iterator, Set, Tuple
+
+import networkx as nx
+
+from .dependency_graph import DependencyGraph, copy_clusters
+from .reachability import ReachabilityIndex
+from .utils import OrderedSet
+
+logger = logging.getLogger(__name__)
+
+# Dependency graph stored in flat arrays instead of the dicts of dicts of
+# networkx. The node names are interned to integer ids (in insertion order),
+# the node attributes are stored in one column per attribute, and the edges
+# in two arrays of ids. The forward (CSR) and reverse (CSC) adjacency indexes
+# are built from the edge arrays when needed, and rebuilt after edges are
+# added. Removing nodes or edges only marks them as dead.
+#
+# The subset of the networkx API used by the front-ends, middlewares and
+# back-ends is implemented, with the same iteration orders as
+# `nx.OrderedDiGraph`: `nodes` and `adj`/`succ`/`pred` views, adding and
+# removing nodes and edges, `descendants` and `ancestors` (answered by a
+# ReachabilityIndex). Edge attributes are not stored.
+
+
+class _Missing:
+    # Marks the absence of an attribute in a column. Unpickled as the same
+    # object, so that it can be compared with `is`.
+    def __reduce__(self):
+        return '_MISSING'
+
+    def __repr__(self):
+        return '_MISSING'
+
+
+_MISSING = _Missing()
+
+
+class _NodeAttrs(MutableMapping):
+    # Attributes of one node, read from and written to the columns
+    def __init__(self, graph, index: int):
+        self._graph = graph
+        self._index = index
+
+    def _column(self, key):
+        column = self._graph._attrs.get(key)
+        if (column is None or self._index >= len(column)
+                or column[self._index] is _MISSING):
+            raise KeyError(key)
+        return column
+
+    def __getitem__(self, key):
+        return self._column(key)[self._index]
+
+    def __setitem__(self, key, value):
+        self._graph._set_attr(self._index, key, value)
+
+    def __delitem__(self, key):
+        self._column(key)[self._index] = _MISSING
+
+    def __iter__(self):
+        for key, column in self._graph._attrs.items():
+            if self._index < len(column) and column[self._index] \
+                    is not _MISSING:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _NodeView(Mapping):
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __call__(self, data=False):
+        return self.items() if data else self
+
+    def __getitem__(self, node):
+        return _NodeAttrs(self._graph, self._graph._ids[node])
+
+    def __iter__(self):
+        names = self._graph._names
+        for index, alive in enumerate(self._graph._alive):
+            if alive:
+                yield names[index]
+
+    def __len__(self):
+        return self._graph._n_alive
+
+    def __contains__(self, node):
+        return node in self._graph._ids
+
+
+class _NeighborsView(Mapping):
+    # Successors (or predecessors) of a node, mapped to their (empty) edge
+    # attributes
+    def __init__(self, graph, index: int, reverse: bool):
+        self._graph = graph
+        self._index = index
+        self._reverse = reverse
+
+    def _indices(self):
+        return self._graph._neighbor_indices(self._index, self._reverse)
+
+    def __getitem__(self, node):
+        if node not in self:
+            raise KeyError(node)
+        return dict()
+
+    def __iter__(self):
+        names = self._graph._names
+        for index in self._indices():
+            yield names[index]
+
+    def __len__(self):
+        return sum(1 for _ in self._indices())
+
+    def __contains__(self, node):
+        index = self._graph._ids.get(node)
+        return index is not None and index in self._indices()
+
+
+class _AdjacencyView(Mapping):
+    def __init__(self, graph, reverse=False):
+        self._graph = graph
+        self._reverse = reverse
+
+    def __getitem__(self, node):
+        return _NeighborsView(self._graph, self._graph._ids[node],
+                              self._reverse)
+
+    def __iter__(self):
+        return iter(self._graph.nodes)
+
+    def __len__(self):
+        return len(self._graph.nodes)
+
+    def __contains__(self, node):
+        return node in self._graph._ids
+
+
+def _group_by(keys: array, n: int) -> Tuple[array, array]:
+    # Counting sort of the edges by `keys`: returns (offsets, edges) where
+    # the edges of key `k` are `edges[offsets[k]:offsets[k + 1]]`, in order
+    offsets = array('i', bytes(4 * (n + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    positions = offsets[:-1]
+    edges = array('i', bytes(4 * len(keys)))
+    for edge, key in enumerate(keys):
+        edges[positions[key]] = edge
+        positions[key] += 1
+    return offsets, edges
+
+
+class CompactDependencyGraph:
+    def __init__(self, **attr):
+        self.graph = dict(attr)
+        self.clusters = OrderedSet()
+
+        self._ids = dict()  # node name -> id
+        self._names = []  # id -> node name (None once removed)
+        self._alive = bytearray()
+        self._n_alive = 0
+        self._attrs = dict()  # attribute name -> column
+
+        self._edge_src = array('i')
+        self._edge_dst = array('i')
+        self._edge_alive = bytearray()
+        self._n_edges = 0
+        self._index = None  # (out offsets, out edges, in offsets, in edges)
+        self._reachability = None  # Dropped when nodes or edges change
+
+        self.nodes = _NodeView(self)
+        self.adj = self.succ = _AdjacencyView(self)
+        self.pred = _AdjacencyView(self, reverse=True)
+
+    # Construction
+
+    def _node_id(self, node) -> int:
+        index = self._ids.get(node)
+        if index is None:
+            index = len(self._names)
+            self._ids[node] = index
+            self._names.append(node)
+            self._alive.append(1)
+            self._n_alive += 1
+            self._reachability = None
+        return index
+
+    def _set_attr(self, index: int, key, value):
+        column = self._attrs.get(key)
+        if column is None:
+            column = self._attrs[key] = []
+        if len(column) <= index:
+            column.extend([_MISSING] * (index + 1 - len(column)))
+        column[index] = value
+
+    def add_node(self, node, **attr):
+        index = self._node_id(node)
+        for key, value in attr.items():
+            self._set_attr(index, key, value)
+
+    def add_nodes_from(self, nodes, **attr):
+        for node in nodes:
+            self.add_node(node, **attr)
+
+    def add_edge(self, u, v):
+        self._edge_src.append(self._node_id(u))
+        self._edge_dst.append(self._node_id(v))
+        self._edge_alive.append(1)
+        self._index = None
+        self._reachability = None
+
+    def add_edges_from(self, edges):
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    # Adjacency indexes
+
+    def _compact_edges(self):
+        alive = self._edge_alive
+        if alive.count(0) == 0:
+            return
+        self._edge_src = array('i', (u for e, u in enumerate(self._edge_src)
+                                     if alive[e]))
+        self._edge_dst = array('i', (v for e, v in enumerate(self._edge_dst)
+                                     if alive[e]))
+        self._edge_alive = bytearray(b'\x01') * len(self._edge_src)
+
+    def _remove_duplicate_edges(self, out_offsets, out_edges) -> bool:
+        # Keeps the first one of the edges added several times, which is
+        # where networkx keeps an edge added twice
+        dst = self._edge_dst
+        removed = False
+        for u in range(len(out_offsets) - 1):
+            start, end = out_offsets[u], out_offsets[u + 1]
+            if end - start < 2:
+                continue
+            seen = set()
+            for e in out_edges[start:end]:
+                if dst[e] in seen:
+                    self._edge_alive[e] = 0
+                    removed = True
+                seen.add(dst[e])
+        return removed
+
+    def _adjacency_index(self):
+        if self._index is not None:
+            return self._index
+        self._compact_edges()
+        n = len(self._names)
+        out_offsets, out_edges = _group_by(self._edge_src, n)
+        if self._remove_duplicate_edges(out_offsets, out_edges):
+            self._compact_edges()
+            out_offsets, out_edges = _group_by(self._edge_src, n)
+        in_offsets, in_edges = _group_by(self._edge_dst, n)
+        self._n_edges = len(self._edge_src)
+        self._index = (out_offsets, out_edges, in_offsets, in_edges)
+        return self._index
+
+    def _edge_ids(self, index: int, reverse: bool) -> Iterator[int]:
+        out_offsets, out_edges, in_offsets, in_edges = \
+            self._adjacency_index()
+        offsets, edges = ((in_offsets, in_edges) if reverse
+                          else (out_offsets, out_edges))
+        if index + 1 >= len(offsets):  # Node added after the index
+            return
+        alive = self._edge_alive
+        for i in range(offsets[index], offsets[index + 1]):
+            if alive[edges[i]]:
+                yield edges[i]
+
+    def _neighbor_indices(self, index: int, reverse=False) -> Iterator[int]:
+        self._adjacency_index()  # May compact the edge arrays
+        other = self._edge_src if reverse else self._edge_dst
+        for e in self._edge_ids(index, reverse):
+            yield other[e]
+
+    # Removal
+
+    def _remove_edge_id(self, e: int):
+        self._edge_alive[e] = 0
+        self._n_edges -= 1
+        self._reachability = None
+
+    def _remove_node_id(self, node, index: int):
+        for reverse in (False, True):
+            for e in list(self._edge_ids(index, reverse)):
+                if self._edge_alive[e]:  # Self-loops are seen twice
+                    self._remove_edge_id(e)
+        del self._ids[node]
+        self._names[index] = None
+        self._reachability = None
+        self._alive[index] = 0
+        self._n_alive -= 1
+        for column in self._attrs.values():
+            if index < len(column):
+                column[index] = _MISSING
+
+    def remove_node(self, node):
+        index = self._ids.get(node)
+        if index is None:
+            raise nx.NetworkXError('The node %s is not in the graph.'
+                                   % (node,))
+        self._remove_node_id(node, index)
+        for cluster in self.clusters:
+            cluster.discard_nodes({node})
+
+    def remove_nodes_from(self, nodes):
+        removed = set()
+        for node in nodes:
+            index = self._ids.get(node)
+            if index is not None:
+                self._remove_node_id(node, index)
+                removed.add(node)
+        for cluster in self.clusters:
+            cluster.discard_nodes(removed)
+
+    def _find_edge(self, u, v):
+        iu, iv = self._ids.get(u), self._ids.get(v)
+        if iu is None or iv is None:
+            return None
+        self._adjacency_index()
+        dst = self._edge_dst
+        return next((e for e in self._edge_ids(iu, False) if dst[e] == iv),
+                    None)
+
+    def remove_edge(self, u, v):
+        e = self._find_edge(u, v)
+        if e is None:
+            raise nx.NetworkXError('The edge %s-%s is not in the graph.'
+                                   % (u, v))
+        self._remove_edge_id(e)
+
+    def remove_edges_from(self, edges):
+        for u, v in list(edges):
+            e = self._find_edge(u, v)
+            if e is not None:
+                self._remove_edge_id(e)
+
+    # Queries
+
+    def __contains__(self, node):
+        return node in self._ids
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return self._n_alive
+
+    def is_directed(self) -> bool:
+        return True
+
+    def is_multigraph(self) -> bool:
+        return False
+
+    def has_node(self, node) -> bool:
+        return node in self._ids
+
+    def has_edge(self, u, v) -> bool:
+        return self._find_edge(u, v) is not None
+
+    def number_of_nodes(self) -> int:
+        return self._n_alive
+
+    def number_of_edges(self) -> int:
+        self._adjacency_index()
+        return self._n_edges
+
+    def successors(self, node):
+        return iter(self.succ[node])
+
+    neighbors = successors
+
+    def predecessors(self, node):
+        return iter(self.pred[node])
+
+    def adjacency(self):
+        return ((node, self.succ[node]) for node in self.nodes)
+
+    def out_degree(self, node) -> int:
+        return len(self.succ[node])
+
+    def in_degree(self, node) -> int:
+        return len(self.pred[node])
+
+    def out_edges(self, node):
+        return [(node, v) for v in self.succ[node]]
+
+    def in_edges(self, node):
+        return [(u, node) for u in self.pred[node]]
+
+    def edges(self):
+        names = self._names
+        for index, alive in enumerate(self._alive):
+            if alive:
+                for other in self._neighbor_indices(index):
+                    yield names[index], names[other]
+
+    def reachability(self) -> ReachabilityIndex:
+        if self._reachability is None:
+            self._reachability = ReachabilityIndex(
+                self._names, self._ids, self._neighbor_indices)
+        return self._reachability
+
+    def descendants(self, node) -> Set:
+        return self.reachability().descendants(node)
+
+    def ancestors(self, node) -> Set:
+        return self.reachability().ancestors(node)
+
+    # Copies and conversions
+
+    def copy(self):
+        graph = self.__class__(**self.graph)
+        graph.clusters = copy_clusters(self.clusters)
+        graph._ids = dict(self._ids)
+        graph._names = list(self._names)
+        graph._alive = bytearray(self._alive)
+        graph._n_alive = self._n_alive
+        graph._attrs = {key: list(column)
+                        for key, column in self._attrs.items()}
+        graph._edge_src = array('i', self._edge_src)
+        graph._edge_dst = array('i', self._edge_dst)
+        graph._edge_alive = bytearray(self._edge_alive)
+        graph._n_edges = self._n_edges
+        graph._index = self._index
+        if self._index is not None:
+            graph._index = tuple(array('i', a) for a in self._index)
+        return graph
+
+    @classmethod
+    def from_csr(cls, names, offsets, targets, columns, **attr):
+        # Graph of the nodes `names`, where the successors of the node `i`
+        # are `targets[offsets[i]:offsets[i + 1]]`, and `columns` maps each
+        # attribute to its {node index: value} (see snapshot.py)
+        graph = cls(**attr)
+        n = len(names)
+        graph._names = list(names)
+        graph._ids = {node: i for i, node in enumerate(graph._names)}
+        graph._alive = bytearray(b'\x01') * n
+        graph._n_alive = n
+        for key, values in columns.items():
+            column = graph._attrs[key] = [_MISSING] * n
+            for i, value in values.items():
+                column[i] = value
+        for i in range(n):
+            graph._edge_src.extend(array('i', [i]) * (offsets[i + 1]
+                                                       - offsets[i]))
+        graph._edge_dst = array('i', targets)
+        graph._edge_alive = bytearray(b'\x01') * len(targets)
+        return graph
+
+    def to_networkx(self) -> DependencyGraph:
+        graph = DependencyGraph(**self.graph)
+        for node, attrs in self.nodes.items():
+            graph.add_node(node, **attrs)
+        graph.add_edges_from(self.edges())
+        graph.clusters = copy_clusters(self.clusters)
+        return graph
+
+    @classmethod
+    def from_networkx(cls, nx_graph: nx.DiGraph):
+        graph = cls(**nx_graph.graph)
+        for node, attrs in nx_graph.nodes.items():
+            graph.add_node(node, **attrs)
+        graph.add_edges_from(nx_graph.edges())
+        graph.clusters = copy_clusters(getattr(nx_graph, 'clusters', ()))
+        return graph
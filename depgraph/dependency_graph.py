@@ -1,18 +1,107 @@
+from typing import Iterable, Iterator, Set, Tuple
+
 import networkx as nx
 
+from .reachability import ReachabilityIndex
 from .utils import OrderedSet
 
 
-class Cluster(nx.OrderedDiGraph):
-    def __init__(self, name, subgraph=None, **attr):
-        if subgraph:
-            super().__init__(subgraph, **attr)
-        else:
-            super().__init__(**attr)
+class Cluster:
+    # Named set of nodes of a dependency graph. The graph removes its nodes
+    # from its clusters when they are removed, and the edges of a cluster
+    # are read from the graph, so the clusters only hold the node names.
+    def __init__(self, name, nodes=()):
         self.name = name
+        self.nodes = OrderedSet(nodes)
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add_node(self, node):
+        self.nodes.add(node)
+
+    def add_nodes_from(self, nodes):
+        for node in nodes:
+            self.nodes.add(node)
+
+    def discard_nodes(self, nodes: Set):
+        if len(nodes) < len(self.nodes):
+            for node in nodes:
+                self.nodes.discard(node)
+        else:
+            self.nodes = OrderedSet(node for node in self.nodes
+                                    if node not in nodes)
+
+    def edges(self, dep_graph) -> Iterator[Tuple]:
+        return ((u, v) for u in self.nodes for v in dep_graph.succ[u]
+                if v in self.nodes)
+
+
+def copy_clusters(clusters: Iterable[Cluster]) -> OrderedSet:
+    return OrderedSet(Cluster(cluster.name, cluster.nodes)
+                      for cluster in clusters)
+
+
+def _invalidates_reachability(method):
+    def wrapper(self, *args, **kwargs):
+        self._reachability = None
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    return wrapper
 
 
 class DependencyGraph(nx.OrderedDiGraph):
     def __init__(self, **attr):
+        self._reachability = None
         super().__init__(**attr)
         self.clusters = OrderedSet()
+
+    # The reachability index is dropped whenever nodes or edges change
+    add_node = _invalidates_reachability(nx.OrderedDiGraph.add_node)
+    add_nodes_from = _invalidates_reachability(
+        nx.OrderedDiGraph.add_nodes_from)
+    add_edge = _invalidates_reachability(nx.OrderedDiGraph.add_edge)
+    add_edges_from = _invalidates_reachability(
+        nx.OrderedDiGraph.add_edges_from)
+    remove_edge = _invalidates_reachability(nx.OrderedDiGraph.remove_edge)
+    remove_edges_from = _invalidates_reachability(
+        nx.OrderedDiGraph.remove_edges_from)
+    update = _invalidates_reachability(nx.OrderedDiGraph.update)
+    clear = _invalidates_reachability(nx.OrderedDiGraph.clear)
+    clear_edges = _invalidates_reachability(nx.OrderedDiGraph.clear_edges)
+
+    def remove_node(self, n):
+        self._reachability = None
+        super().remove_node(n)
+        for cluster in self.clusters:
+            cluster.discard_nodes({n})
+
+    def remove_nodes_from(self, nodes):
+        self._reachability = None
+        nodes = set(node for node in nodes if node in self)
+        super().remove_nodes_from(nodes)
+        for cluster in self.clusters:
+            cluster.discard_nodes(nodes)
+
+    def copy(self, as_view=False):
+        graph = super().copy(as_view)
+        if not as_view:
+            graph.clusters = copy_clusters(self.clusters)
+        return graph
+
+    def reachability(self) -> ReachabilityIndex:
+        if self._reachability is None:
+            self._reachability = ReachabilityIndex.of_networkx(self)
+        return self._reachability
+
+    def descendants(self, node):
+        return self.reachability().descendants(node)
+
+    def ancestors(self, node):
+        return self.reachability().ancestors(node)
@@ -0,0 +1,120 @@
+import logging
+import os
+import re
+from collections import OrderedDict
+from typing import Iterable, List
+
+from .utils import parallel_map
+
+logger = logging.getLogger(__name__)
+
+# Directories which never contain interesting files
+DEFAULT_EXCLUDED_DIRS = ('.hollogs',)
+
+
+class FileIndex:
+    # Index of the files under `root`, classified by suffix. The tree is
+    # walked once, without descending into the excluded directories, and the
+    # files whose absolute path doesn't match `filter_regex_str` are skipped.
+    #
+    # The files are listed in the same order as `sorted(os.walk(root))`
+    # would give: directories sorted by path, then files sorted by name.
+    #
+    # With `directories`, only the files directly in those directories are
+    # indexed (listed using `jobs` threads) instead of walking `root`.
+
+    def __init__(self, root: str, suffixes: Iterable[str],
+                 filter_regex_str=None, excluded_dirs=DEFAULT_EXCLUDED_DIRS,
+                 directories=None, jobs=1):
+        self.root = os.path.abspath(root)
+        self.suffixes = tuple(suffixes)
+        self.excluded_dirs = frozenset(excluded_dirs)
+        self.filter_regex = None
+        if filter_regex_str:
+            self.filter_regex = re.compile(filter_regex_str)
+        self.buckets = OrderedDict((suffix, []) for suffix in self.suffixes)
+        self.directories = None
+        if directories is None:
+            self._walk()
+        else:
+            self.directories = [os.path.abspath(d) for d in directories]
+            self._scan_directories(jobs)
+
+    def _scan_directory(self, dir_path: str, sub_dirs: List[str]) \
+            -> List[str]:
+        try:
+            entries = list(os.scandir(dir_path))
+        except OSError as e:  # Same as os.walk: ignore unreadable dirs
+            logger.debug('Cannot list "%s": %s', dir_path, e)
+            return []
+
+        file_names = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if (entry.name not in self.excluded_dirs
+                        and not entry.is_symlink()):
+                    sub_dirs.append(entry.path)
+            elif entry.name.endswith(self.suffixes):
+                if (self.filter_regex and not self.filter_regex.search(
+                        '/'.join((dir_path, entry.name)))):
+                    continue
+                file_names.append(entry.name)
+        return file_names
+
+    def _walk(self):
+        files_by_dir = []
+        to_visit = [self.root]
+        while to_visit:
+            dir_path = to_visit.pop()
+            file_names = self._scan_directory(dir_path, to_visit)
+            if file_names:
+                files_by_dir.append((dir_path, file_names))
+        self._add_files(files_by_dir)
+
+    def _scan_directories(self, jobs: int):
+        files_by_dir = parallel_map(
+            lambda dir_path: (dir_path, self._scan_directory(dir_path, [])),
+            self.directories, jobs)
+        self._add_files(
+            (dir_path, file_names) for dir_path, file_names in files_by_dir
+            if file_names)
+
+    def _add_files(self, files_by_dir):
+        for dir_path, file_names in sorted(files_by_dir):
+            for file_name in sorted(file_names):
+                file_path = '/'.join((dir_path, file_name))
+                for suffix in self.suffixes:
+                    if file_name.endswith(suffix):
+                        self.buckets[suffix].append(file_path)
+
+    def files(self, suffix: str, under=None) -> List[str]:
+        # Files ending with `suffix`, optionally only the ones under the
+        # directory `under`
+        files = self.buckets[suffix]
+        if under is None:
+            return list(files)
+        prefix = os.path.join(os.path.abspath(under), '')
+        return [f for f in files if f.startswith(prefix)]
+
+    def contains_dir(self, path: str) -> bool:
+        # Whether the walk went through the directory `path`, i.e. whether
+        # `files(..., under=path)` gives the same files as a walk of `path`.
+        # It didn't if `path` is outside of the root, or below an excluded
+        # or symlinked directory, or if only some directories were indexed.
+        if self.directories is not None:
+            return False
+        path = os.path.abspath(path)
+        if path == self.root:
+            return True
+        if not path.startswith(os.path.join(self.root, '')):
+            return False
+        current = self.root
+        for name in os.path.relpath(path, self.root).split(os.sep):
+            current = os.path.join(current, name)
+            if name in self.excluded_dirs or os.path.islink(current):
+                return False
+        return True
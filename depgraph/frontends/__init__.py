@@ -1,8 +1,11 @@
 from .hol4_thms import Hol4ThmsFrontEnd
+from .hol4_thydata import Hol4ThyDataFrontEnd
 from .hol4 import Hol4FrontEnd
+from .snapshot import SnapshotFrontEnd
 
 FRONT_ENDS = [
     Hol4FrontEnd,
     Hol4ThmsFrontEnd,
+    Hol4ThyDataFrontEnd,
+    SnapshotFrontEnd,
 ]
-
@@ -1,11 +1,16 @@
 import abc
 from argparse import ArgumentParser
+from typing import List
 
 from ..config import make_pipeline_action
 from ..dependency_graph import DependencyGraph
 
 
 class FrontEnd(metaclass=abc.ABCMeta):
+    # Keys of the config which change the graph of the front-end, besides its
+    # arguments and `watched_files()` (see --stage-cache)
+    config_keys = ()
+
     def __init__(self, name):
         self.frontend_name = name
 
@@ -18,6 +23,19 @@ class FrontEnd(metaclass=abc.ABCMeta):
     def get_dependency_graph(self) -> DependencyGraph:
         raise NotImplementedError()
 
+    def watched_files(self) -> List[str]:
+        # Files whose changes invalidate the dependency graph (see --watch)
+        return []
+
+    def update_dependency_graph(self, dep_graph: DependencyGraph,
+                                files: List[str], changed_files: List[str],
+                                removed_files: List[str]) -> DependencyGraph:
+        # Called in watch mode with the current `watched_files()`, once some
+        # of them were added or modified (`changed_files`) or removed
+        # (`removed_files`). The front-ends can patch `dep_graph` instead of
+        # rebuilding it.
+        return self.get_dependency_graph()
+
 
 def make_frontend_action(action_class, **kwargs):
     return make_pipeline_action('frontend', action_class, **kwargs)
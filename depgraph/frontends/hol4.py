@@ -2,13 +2,16 @@ import logging
 import re
 from argparse import ArgumentParser
 from collections import OrderedDict
-from typing import List, Set, Iterable
+from typing import List, Set, Iterable, Tuple
 
 from .frontend import FrontEnd, make_frontend_action
+from .holmakefile import find_build_directories
 from ..config import Config
 from ..dependency_graph import DependencyGraph
+from ..file_index import FileIndex
+from ..graph_cores import new_dependency_graph
+from ..parse_cache import ParseCache
 from ..utils import OrderedSet, DefaultOrderedDict
-from ..utils import get_all_files_ending_with
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +32,11 @@ def _read_holmake_dep_file(path: str) -> List[str]:
         return list(content)
 
 
+def _read_module_deps(uo_file_path: str) -> Tuple[str, List[str]]:
+    module_path = _remove_extension(uo_file_path)
+    return module_path, _read_holmake_dep_file(uo_file_path)
+
+
 def _prettify_long_name(long_name: str) -> str:
     pretty = long_name
 
@@ -103,11 +111,27 @@ def _generate_short_filename_mapping(long_module_paths: Set[str]):
     return mapping
 
 
+def _gather_module_paths(deps_of_modules_dict) -> Set[str]:
+    all_module_paths = OrderedSet()
+    for module_path, dependencies in deps_of_modules_dict.items():
+        all_module_paths.add(module_path)
+        for dependency in dependencies:
+            all_module_paths.add(dependency)
+    return all_module_paths
+
+
 class Hol4FrontEnd(FrontEnd):
+    config_keys = ('hol4-follow-includes', 'filter-files-regex',
+                   'exclude-dependencies-regex', 'keep-dependencies-regex')
+
     def __init__(self, config: Config, args):
         super().__init__('HOL4 from .uo files')
         self.config = config
         self.path = args[0]
+        self.cache = ParseCache.from_config(config, 'hol4')
+        self.deps_of_modules_dict = None
+        self.all_module_paths = None
+        self.short_name_mapping = None
 
     @staticmethod
     def install_arg_parser(parser: ArgumentParser):
@@ -123,41 +147,77 @@ class Hol4FrontEnd(FrontEnd):
                                         nargs=1,
                                         metavar='SRC-ROOT')
         )
+        parser.add_argument(
+            '--hol4-follow-includes',
+            dest='hol4-follow-includes',
+            required=False,
+            default=False,
+            action='store_true',
+            help='Only look for .uo files in the directories reachable from '
+                 'the Holmakefile of SRC-ROOT through INCLUDES, instead of '
+                 'in the whole tree'
+        )
 
-    def get_dependency_graph(self) -> DependencyGraph:
-        logger.info("Generating dependency graph in: %s", self.path)
-
-        # Get all Holmake dependency files
-        holmake_dep_exts = ['.uo']
-        holmake_dep_files = get_all_files_ending_with(
-            self.path, holmake_dep_exts, self.config['filter-files-regex'])
-
-        # Read all the files, resulting in [(path, [dep_path])]
-        files_and_deps = []
-        for file_path in holmake_dep_files:
-            deps = _read_holmake_dep_file(
-                file_path)
-            files_and_deps.append((file_path, deps))
+    def watched_files(self) -> List[str]:
+        directories = None
+        if self.config['hol4-follow-includes']:
+            directories = find_build_directories(self.path,
+                                                 self.config['jobs'])
+        file_index = FileIndex(self.path, ['.uo'],
+                               self.config['filter-files-regex'],
+                               directories=directories,
+                               jobs=self.config['jobs'])
+        return file_index.files('.uo')
+
+    def _read_dependencies(self, holmake_dep_files: List[str]):
+        # Read all the files, resulting in [(module_path, [dep_path])]. The
+        # reads are I/O bound, so they are spread over a thread pool; the
+        # results come back in file order, which keeps the output stable.
+        # Files which did not change since the last run come from the cache.
+        jobs = self.config['jobs']
+        if jobs > 1:
+            logger.info('Reading %d files using %d jobs...',
+                        len(holmake_dep_files), jobs)
+        modules_and_deps = self.cache.map(
+            _read_module_deps, holmake_dep_files, jobs)
+        self.cache.save()
 
         # Merge all the Holmake dep files (.uo, .ui)
         deps_of_modules_dict = DefaultOrderedDict(OrderedSet)
-        for file_path, dependencies in files_and_deps:
+        for module_path, dependencies in modules_and_deps:
             for dependency in dependencies:
-                module_path = _remove_extension(file_path)
                 deps_of_modules_dict[module_path].add(dependency)
         for module_path in deps_of_modules_dict:
             if module_path in deps_of_modules_dict[module_path]:
                 deps_of_modules_dict[module_path].remove(module_path)
+        return deps_of_modules_dict
+
+    def get_dependency_graph(self) -> DependencyGraph:
+        logger.info("Generating dependency graph in: %s", self.path)
+
+        # Get all Holmake dependency files
+        holmake_dep_files = self.watched_files()
+
+        self.deps_of_modules_dict = self._read_dependencies(holmake_dep_files)
+        graph = self._build_graph()
+
+        logger.info("Done.")
+        return graph
+
+    def _filters_dependencies(self) -> bool:
+        return (self.config['exclude-dependencies-regex'] is not None
+                or self.config['keep-dependencies-regex'] is not None)
+
+    def _build_graph(self) -> DependencyGraph:
+        deps_of_modules_dict = self.deps_of_modules_dict
 
         # Gather all modules paths
-        all_module_paths = OrderedSet()
-        for module_path, dependencies in deps_of_modules_dict.items():
-            all_module_paths.add(module_path)
-            for dependency in dependencies:
-                all_module_paths.add(dependency)
+        all_module_paths = _gather_module_paths(deps_of_modules_dict)
+        self.all_module_paths = all_module_paths
 
         # Generate a short name mapping
         short_name_mapping = _generate_short_filename_mapping(all_module_paths)
+        self.short_name_mapping = short_name_mapping
 
         # Compile those two regex to filter dependencies
         exclude_dependencies_regex = None
@@ -173,7 +233,7 @@ class Hol4FrontEnd(FrontEnd):
         filtered_dependencies = set()
 
         # Generate the dependency graph
-        graph = DependencyGraph()
+        graph = new_dependency_graph(self.config)
         for module_path in all_module_paths:  # Nodes
             short_name = short_name_mapping[module_path]
             graph.add_node(
@@ -206,5 +266,35 @@ class Hol4FrontEnd(FrontEnd):
             if len(graph.adj[filtered_dependency]) == 0:
                 graph.remove_node(filtered_dependency)
 
-        logger.info("Done.")
         return graph
+
+    def update_dependency_graph(self, dep_graph: DependencyGraph,
+                                files: List[str], changed_files: List[str],
+                                removed_files: List[str]) -> DependencyGraph:
+        self.deps_of_modules_dict = self._read_dependencies(files)
+
+        # The short names depend on the whole set of modules, and the
+        # filtered dependencies on the edges of the other modules, so the
+        # graph can only be patched if none of those changed.
+        all_module_paths = _gather_module_paths(self.deps_of_modules_dict)
+        if (set(all_module_paths) != set(self.all_module_paths)
+                or self._filters_dependencies()):
+            logger.info('Rebuilding the dependency graph...')
+            return self._build_graph()
+
+        # Replace the edges of the modules whose file changed. A module whose
+        # file was removed but which is still a dependency of other modules
+        # is kept, without its dependencies.
+        mapping = self.short_name_mapping
+        for module_path in OrderedSet(map(_remove_extension,
+                                          changed_files + removed_files)):
+            if module_path not in mapping:
+                continue
+            short_name = mapping[module_path]
+            dependencies = self.deps_of_modules_dict.get(module_path, ())
+            dep_graph.remove_edges_from(list(dep_graph.out_edges(short_name)))
+            dep_graph.add_edges_from(
+                (short_name, mapping[dependency])
+                for dependency in dependencies)
+            logger.debug('Updated the dependencies of %s.', short_name)
+        return dep_graph
@@ -1,29 +1,32 @@
 import logging
 import re
 from argparse import ArgumentParser
-from typing import List, Set, Dict, NewType
+from collections import OrderedDict
+from typing import List, Set, Dict, NewType, Iterable
 
 from .frontend import FrontEnd, make_frontend_action
+from .sml_lexer import code_lines
 from ..config import Config
 from ..dependency_graph import DependencyGraph
-from ..utils import get_all_files_ending_with, OrderedSet, DefaultOrderedDict
+from ..file_index import FileIndex
+from ..graph_cores import new_dependency_graph
+from ..parse_cache import ParseCache
+from ..utils import OrderedSet, DefaultOrderedDict
 
 logger = logging.getLogger(__name__)
 
 ThmId = NewType('ThmId', str)
 
 def_suffix_regex = re.compile('_def$', re.IGNORECASE)
-comment_regex = re.compile("\\(\\*.*?\\*\\)", re.DOTALL)
 thm_name_regex = re.compile('val +([^ ]+) *: *thm')
 new_name_regex = re.compile(
     'val\\s+([^ ]+)\\s*=\\s*(?:store_thm|prove|Define)',
     re.MULTILINE)
-
-
-def _remove_comments(lines: List[str]) -> List[str]:
-    text = '\n'.join(lines)
-    stripped = re.sub(comment_regex, '', text)
-    yield from stripped.split('\n')
+delimiters_regex = re.compile('|'.join(map(re.escape, [
+    ' ', ',', ';', '\\', '[', ']', '(', ')', '+', '-', '*',
+    '/', '<', '>', '!', '?', '`', ':',
+    '.',
+])))
 
 
 class Thm:
@@ -48,47 +51,89 @@ def _id_of_thm_name(thm_name: str) -> ThmId:
 
 def _read_thm_names_in_sig_file(theory_sig_file: str) -> Set[Thm]:
     thm_names = OrderedSet()
-    with open(theory_sig_file, 'r') as f:
-        for line in _remove_comments(f.readlines()):
-            result = thm_name_regex.search(line)
-            if result:
-                thm_name = result.group(1)
-                thm_names.add(Thm(
-                    thm_id=_id_of_thm_name(thm_name),
-                    file_path=theory_sig_file,
-                    full_name=thm_name,
-                ))
+    for line in code_lines(theory_sig_file):
+        result = thm_name_regex.search(line)
+        if result:
+            thm_name = result.group(1)
+            thm_names.add(Thm(
+                thm_id=_id_of_thm_name(thm_name),
+                file_path=theory_sig_file,
+                full_name=thm_name,
+            ))
     return thm_names
 
 
-def _read_thm_names_in_sig_files(theory_sig_files: List[str]) -> Set[Thm]:
+def _read_thm_names_in_sig_files(theory_sig_files: List[str],
+                                 cache: ParseCache, jobs=1) -> Set[Thm]:
     thm_names = OrderedSet()
-    for sig_file in theory_sig_files:
-        names_in_file = _read_thm_names_in_sig_file(sig_file)
+    for names_in_file in cache.map(_read_thm_names_in_sig_file,
+                                   theory_sig_files, jobs, processes=True):
         thm_names |= names_in_file
     return thm_names
 
 
-def _read_thm_names_in_sml_file(script_sml_file: str) -> Set[Thm]:
-    thm_names = OrderedSet()
-    with open(script_sml_file, 'r') as f:
-        for line in _remove_comments(f.readlines()):
-            regex_result = new_name_regex.search(line)
-            if regex_result:
-                thm_name = regex_result.group(1)
-                thm_names.add(Thm(
-                    thm_id=_id_of_thm_name(thm_name),
-                    file_path=script_sml_file,
-                    full_name=thm_name,
-                ))
-    return thm_names
+class ScriptScan:
+    # Result of scanning a xxxScript.sml file once: the names of the theorems
+    # it defines, and the words found after each definition. A section starts
+    # at a line which looks like a definition and is tagged with the id of
+    # the defined theorem. The words before the first definition are dropped,
+    # since they cannot be attributed to any theorem. The sections are only
+    # recorded for the files whose dependencies are resolved.
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.thm_names = []
+        self.sections = []
+
+
+def _scan_sml_file(script_sml_file: str, collect_words=True) -> ScriptScan:
+    scan = ScriptScan(script_sml_file)
+    word_ids = dict()
+    words = None
+
+    for line in code_lines(script_sml_file):
+        regex_result = new_name_regex.search(line)
+        if regex_result:  # New theorem
+            thm_name = regex_result.group(1)
+            scan.thm_names.append(thm_name)
+            if collect_words:
+                words = OrderedSet()
+                scan.sections.append((_id_of_thm_name(thm_name), words))
+        # no `else`, because of one-liners
+
+        if words is not None:
+            for word in delimiters_regex.split(line):
+                if not word:
+                    continue
+                try:
+                    word_id = word_ids[word]
+                except KeyError:
+                    word_id = word_ids[word] = _id_of_thm_name(word)
+                words.add(word_id)
+
+    return scan
 
 
-def _read_thm_names_in_sml_files(script_sml_files: List[str]) -> Set[Thm]:
+def _scan_thm_names_in_sml_file(script_sml_file: str) -> ScriptScan:
+    return _scan_sml_file(script_sml_file, collect_words=False)
+
+
+def _scan_sml_files(script_sml_files: List[str], cache: ParseCache,
+                    jobs=1, collect_words=True) -> Dict[str, ScriptScan]:
+    # Scanning is CPU bound, so the files are sharded over worker processes
+    scan = _scan_sml_file if collect_words else _scan_thm_names_in_sml_file
+    scans = cache.map(scan, script_sml_files, jobs, processes=True)
+    return OrderedDict(zip(script_sml_files, scans))
+
+
+def _thm_names_in_scans(scans: Iterable[ScriptScan]) -> Set[Thm]:
     thms = OrderedSet()
-    for sml_file in script_sml_files:
-        thms_in_file = _read_thm_names_in_sml_file(sml_file)
-        thms |= thms_in_file
+    for scan in scans:
+        for thm_name in scan.thm_names:
+            thms.add(Thm(
+                thm_id=_id_of_thm_name(thm_name),
+                file_path=scan.file_path,
+                full_name=thm_name,
+            ))
 
     forbidden_names = {'thm', 'lemma'}
     for i in range(20):
@@ -107,49 +152,37 @@ def _read_thm_names_in_sml_files(script_sml_files: List[str]) -> Set[Thm]:
     return thms
 
 
-def _read_dependencies_in_file(script_sml_file: str, thm_ids: Set[ThmId]) \
+def _resolve_dependencies_in_scan(scan: ScriptScan, thm_ids: Set[ThmId]) \
         -> Dict[ThmId, Set[ThmId]]:
-    dependencies = DefaultOrderedDict(lambda: OrderedSet())
+    dependencies = DefaultOrderedDict(OrderedSet)
 
-    # We are scanning through a xxxScript.sml file and adding all known
-    # theorem name as a dependency.
+    # We are going through the sections of a xxxScript.sml file and adding
+    # all known theorem name as a dependency of the current theorem. A
+    # definition of an unknown theorem doesn't change the current theorem.
     curr_thm = None
 
-    with open(script_sml_file, 'r') as f:
-        for line in _remove_comments(f.readlines()):
-            regex_result = new_name_regex.search(line)
-            if regex_result:  # New theorem
-                curr_thm_candidate = _id_of_thm_name(regex_result.group(1))
-                if curr_thm_candidate in thm_ids:
-                    if curr_thm == '_':
-                        curr_thm = None
-                    else:
-                        curr_thm = curr_thm_candidate
-            # no `else`, because of one-liners
-
-            delimiters = [
-                ' ', ',', ';', '\\', '[', ']', '(', ')', '+', '-', '*',
-                '/', '<', '>', '!', '?', '`', ':',
-                '.',
-            ]
-            regex_pattern = '|'.join(map(re.escape, delimiters))
-
-            if curr_thm is not None:
-                for word in re.split(regex_pattern, line):
-                    possible_thm_id = _id_of_thm_name(word)
-                    if (possible_thm_id in thm_ids
-                            and possible_thm_id != curr_thm):
-                        dependencies[curr_thm].add(possible_thm_id)
+    for curr_thm_candidate, words in scan.sections:
+        if curr_thm_candidate in thm_ids:
+            if curr_thm == '_':
+                curr_thm = None
+            else:
+                curr_thm = curr_thm_candidate
+
+        if curr_thm is not None:
+            for possible_thm_id in words:
+                if (possible_thm_id in thm_ids
+                        and possible_thm_id != curr_thm):
+                    dependencies[curr_thm].add(possible_thm_id)
 
     return dependencies
 
 
-def _read_dependencies(script_sml_files: List[str], thm_ids: Set[ThmId]) \
+def _resolve_dependencies(scans: Iterable[ScriptScan], thm_ids: Set[ThmId]) \
         -> Dict[ThmId, Set[ThmId]]:
-    dependencies = DefaultOrderedDict(lambda: OrderedSet())
+    dependencies = DefaultOrderedDict(OrderedSet)
 
-    for script_sml_file in script_sml_files:
-        deps_in_file = _read_dependencies_in_file(script_sml_file, thm_ids)
+    for scan in scans:
+        deps_in_file = _resolve_dependencies_in_scan(scan, thm_ids)
         for thm_name, deps in deps_in_file.items():
             dependencies[thm_name] |= deps
 
@@ -161,12 +194,19 @@ def _read_dependencies(script_sml_files: List[str], thm_ids: Set[ThmId]) \
 
 
 class Hol4ThmsFrontEnd(FrontEnd):
+    config_keys = ('filter-files-regex',)
+
     def __init__(self, config: Config, args):
         self.config = config
         self.path = args[0]
         self.thm_path = args[1]
         if self.thm_path[-1] != '/':
             self.thm_path = '%s/' % self.thm_path
+        self.scripts_cache = ParseCache.from_config(
+            config, 'hol4-thms-scripts')
+        self.names_cache = ParseCache.from_config(
+            config, 'hol4-thms-script-names')
+        self.sigs_cache = ParseCache.from_config(config, 'hol4-thms-sigs')
         super().__init__('HOL4 theorem hierarchy in %s of %s'
                          % (self.path, self.thm_path))
 
@@ -180,36 +220,71 @@ class Hol4ThmsFrontEnd(FrontEnd):
                                         metavar=('SRC-ROOT', 'THM-ROOT'))
         )
 
+    def _list_files(self):
+        # Get the list of all xxxTheory.sig and xxxScript.sml files. The
+        # THM-ROOT usually is inside SRC-ROOT, in which case the same index
+        # is used for both.
+        filter_regex_str = self.config['filter-files-regex']
+        file_index = FileIndex(self.path, ['Theory.sig', 'Script.sml'],
+                               filter_regex_str)
+        theory_sig_files = file_index.files('Theory.sig')
+        script_sml_files = file_index.files('Script.sml')
+
+        if file_index.contains_dir(self.thm_path):
+            thm_path_script_sml_files = file_index.files(
+                'Script.sml', under=self.thm_path)
+        else:
+            thm_path_script_sml_files = FileIndex(
+                self.thm_path, ['Script.sml'],
+                filter_regex_str).files('Script.sml')
+
+        return theory_sig_files, script_sml_files, thm_path_script_sml_files
+
+    def watched_files(self) -> List[str]:
+        return list(OrderedSet(sum(self._list_files(), [])))
+
     def get_dependency_graph(self) -> DependencyGraph:
         logger.info("Generating theorem hierarchy graph in %s of %s...",
                     self.path, self.thm_path)
 
-        # Get the list of all xxxTheory.sig and xxxScript.sml files
-        theory_sig_files = list(filter(
-            lambda f: '.hollogs' not in f,
-            get_all_files_ending_with(self.path, ['Theory.sig'])))
-        script_sml_files = list(filter(
-            lambda f: '.hollogs' not in f,
-            get_all_files_ending_with(self.path, ['Script.sml'])))
-
-        # Extract all theorem names from xxxTheory.sig files
-        sig_thms = _read_thm_names_in_sig_files(theory_sig_files)
-        sml_thms = _read_thm_names_in_sml_files(script_sml_files)
+        theory_sig_files, script_sml_files, thm_path_script_sml_files = \
+            self._list_files()
+
+        # Scan each xxxScript.sml file once, the ones in THM-ROOT included.
+        # Only the words of the files in THM-ROOT are needed, the other files
+        # only define theorem names.
+        jobs = self.config['jobs']
+        thm_path_files = set(thm_path_script_sml_files)
+        names_only_script_sml_files = [
+            f for f in script_sml_files if f not in thm_path_files]
+        if jobs > 1:
+            logger.info('Scanning %d files using %d processes...',
+                        len(names_only_script_sml_files)
+                        + len(thm_path_script_sml_files)
+                        + len(theory_sig_files), jobs)
+        scans = _scan_sml_files(thm_path_script_sml_files, self.scripts_cache,
+                                jobs)
+        self.scripts_cache.save()
+        scans.update(_scan_sml_files(names_only_script_sml_files,
+                                     self.names_cache, jobs,
+                                     collect_words=False))
+        self.names_cache.save()
+
+        # Extract all theorem names from xxxTheory.sig and xxxScript.sml files
+        sig_thms = _read_thm_names_in_sig_files(
+            theory_sig_files, self.sigs_cache, jobs)
+        self.sigs_cache.save()
+        sml_thms = _thm_names_in_scans(scans[f] for f in script_sml_files)
         thms = sig_thms | sml_thms
         thm_ids = set(thm.thm_id for thm in thms)
 
-        # Get the theorem locations
-        # thm_locations = _get_thm_locations(script_sml_files, thm_names)
-
-        # Read dependencies from xxxScript.sml files
-        thm_path_script_sml_files = list(filter(
-            lambda f: '.hollogs' not in f,
-            get_all_files_ending_with(self.thm_path, ['Script.sml'])))
-        thm_dependencies = _read_dependencies(
-            thm_path_script_sml_files, thm_ids)
+        # Now that all theorems are known, resolve the dependencies of the
+        # theorems in the xxxScript.sml files in THM-ROOT
+        thm_dependencies = _resolve_dependencies(
+            (scans[f] for f in thm_path_script_sml_files), thm_ids)
 
         # Generate the dependency graph
-        graph = DependencyGraph()
+        graph = new_dependency_graph(self.config)
         skipped_thms = dict()
         for thm in thms:
             long_name = '::'.join([thm.file_path[:-10], thm.full_name])
@@ -0,0 +1,285 @@
+import logging
+import mmap
+import re
+from argparse import ArgumentParser
+from typing import List, Iterator, Tuple
+
+from .frontend import FrontEnd, make_frontend_action
+from .hol4_thms import Thm, _id_of_thm_name
+from ..config import Config
+from ..dependency_graph import DependencyGraph
+from ..file_index import FileIndex
+from ..graph_cores import new_dependency_graph
+from ..parse_cache import ParseCache
+from ..utils import OrderedSet
+
+logger = logging.getLogger(__name__)
+
+# Theorem dependencies read from the xxxTheory.dat files that Holmake writes
+# next to xxxTheory.sig. Those files are s-expressions, where the theorems
+# section is expected to look like:
+#
+#   (theorems
+#     ("thm_name" ... (dep ((thy n) (thy1 n1 n2 ...) ...)) ...)
+#     ...)
+#
+# In the `dep` list, the first group is the id of the theorem itself (the
+# theory and a number), and each next group lists the numbers of the
+# theorems it depends on in a theory. A theory may be written as a name or
+# as an index in the `(string-table "..." ...)` list of the file. All the
+# other sections (types, terms, ...) are skipped without being decoded.
+
+THEORY_DAT = 'Theory.dat'
+
+_TOKEN_OPEN = 0
+_TOKEN_CLOSE = 1
+_TOKEN_STRING = 2
+_TOKEN_ATOM = 3
+
+_token_regex = re.compile(
+    b'(\\()|(\\))|"((?:[^"\\\\]|\\\\.)*)"|([^\\s()"]+)', re.DOTALL)
+_escape_regex = re.compile(b'\\\\(.)', re.DOTALL)
+
+
+class TheoryData:
+    # Theorems of a xxxTheory.dat file: (name, number, [(theory, numbers)])
+    def __init__(self, file_path: str, theory: str):
+        self.file_path = file_path
+        self.theory = theory
+        self.thms = []
+
+
+def _tokens(buf) -> Iterator[Tuple[int, object]]:
+    for match in _token_regex.finditer(buf):
+        if match.group(1) is not None:
+            yield _TOKEN_OPEN, None
+        elif match.group(2) is not None:
+            yield _TOKEN_CLOSE, None
+        elif match.group(3) is not None:
+            string = _escape_regex.sub(b'\\1', match.group(3))
+            yield _TOKEN_STRING, string.decode('utf-8', errors='replace')
+        else:
+            atom = match.group(4).decode('utf-8', errors='replace')
+            try:
+                atom = int(atom)
+            except ValueError:
+                pass
+            yield _TOKEN_ATOM, atom
+
+
+def _read_list(tokens) -> list:
+    # Reads the rest of a list whose `(` was consumed
+    stack = [[]]
+    for kind, value in tokens:
+        if kind == _TOKEN_OPEN:
+            stack.append([])
+        elif kind == _TOKEN_CLOSE:
+            done = stack.pop()
+            if not stack:
+                return done
+            stack[-1].append(done)
+        else:
+            stack[-1].append(value)
+    return stack[0]  # Truncated file
+
+
+def _skip_list(tokens):
+    depth = 1
+    for kind, _ in tokens:
+        if kind == _TOKEN_OPEN:
+            depth += 1
+        elif kind == _TOKEN_CLOSE:
+            depth -= 1
+            if depth == 0:
+                return
+
+
+def _read_sections(tokens) -> Iterator[Tuple[str, Iterator]]:
+    # Yields (name, tokens) for each `(name ...)` section of the top-level
+    # list. The section must be consumed (or skipped) before the next one.
+    for kind, _ in tokens:
+        if kind == _TOKEN_OPEN:
+            break
+    for kind, value in tokens:
+        if kind == _TOKEN_CLOSE:
+            return
+        if kind != _TOKEN_OPEN:
+            continue
+        kind, name = next(tokens, (_TOKEN_CLOSE, None))
+        if kind == _TOKEN_OPEN:
+            _skip_list(tokens)
+            _skip_list(tokens)
+        elif kind != _TOKEN_CLOSE:
+            yield name, tokens
+
+
+def _dependency_groups(entry: list) -> list:
+    for item in entry:
+        if isinstance(item, list) and item and item[0] == 'dep':
+            groups = item[1:]
+            if len(groups) == 1 and groups[0] \
+                    and all(isinstance(g, list) for g in groups[0]):
+                groups = groups[0]
+            return [g for g in groups if isinstance(g, list) and g]
+    return []
+
+
+def _read_theorems(tokens) -> Iterator[Tuple[str, list]]:
+    # Yields (name, dependency groups) one theorem at a time
+    for kind, _ in tokens:
+        if kind == _TOKEN_CLOSE:
+            return
+        if kind != _TOKEN_OPEN:
+            continue
+        entry = _read_list(tokens)
+        name = next((item for item in entry if isinstance(item, str)), None)
+        groups = _dependency_groups(entry)
+        if name is None or not groups or len(groups[0]) < 2:
+            continue
+        yield name, groups
+
+
+def _read_theory_data_file(dat_file: str) -> TheoryData:
+    theory = dat_file.split('/')[-1][:-len(THEORY_DAT)]
+    data = TheoryData(dat_file, theory)
+    string_table = []
+    raw_thms = []
+
+    with open(dat_file, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files cannot be mapped
+            return data
+        with buf:
+            tokens = _tokens(buf)
+            sections = _read_sections(tokens)
+            try:
+                for name, section_tokens in sections:
+                    if name == 'string-table':
+                        string_table = _read_list(section_tokens)
+                    elif name == 'theorems':
+                        raw_thms.extend(_read_theorems(section_tokens))
+                    else:
+                        _skip_list(section_tokens)
+            finally:  # The regex scanner must release the mapping
+                sections.close()
+                tokens.close()
+
+    # The string table may come after the theorems, so the theories are
+    # only resolved at the end
+    def theory_name(thy):
+        if isinstance(thy, int) and 0 <= thy < len(string_table):
+            return string_table[thy]
+        return str(thy)
+
+    for name, groups in raw_thms:
+        (thy, number), deps = groups[0][:2], groups[1:]
+        if theory_name(thy) != theory:
+            logger.debug('Theorem %s of %s has the id of %s',
+                         name, dat_file, theory_name(thy))
+        data.thms.append((name, number, [
+            (theory_name(group[0]), [n for n in group[1:]
+                                     if isinstance(n, int)])
+            for group in deps]))
+    return data
+
+
+class Hol4ThyDataFrontEnd(FrontEnd):
+    config_keys = ('filter-files-regex',)
+
+    def __init__(self, config: Config, args):
+        self.config = config
+        self.path = args[0]
+        self.thm_path = args[1]
+        if self.thm_path[-1] != '/':
+            self.thm_path = '%s/' % self.thm_path
+        self.cache = ParseCache.from_config(config, 'hol4-thydata')
+        super().__init__('HOL4 theorem hierarchy from the theory data in %s '
+                         'of %s' % (self.path, self.thm_path))
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        parser.add_argument(
+            '--hol4-thydata',
+            required=False,
+            action=make_frontend_action(Hol4ThyDataFrontEnd,
+                                        nargs=2,
+                                        metavar=('SRC-ROOT', 'THM-ROOT'))
+        )
+
+    def _list_files(self):
+        filter_regex_str = self.config['filter-files-regex']
+        file_index = FileIndex(self.path, [THEORY_DAT], filter_regex_str)
+        dat_files = file_index.files(THEORY_DAT)
+        if file_index.contains_dir(self.thm_path):
+            thm_path_dat_files = file_index.files(
+                THEORY_DAT, under=self.thm_path)
+        else:
+            thm_path_dat_files = FileIndex(
+                self.thm_path, [THEORY_DAT],
+                filter_regex_str).files(THEORY_DAT)
+        return dat_files, thm_path_dat_files
+
+    def watched_files(self) -> List[str]:
+        return list(OrderedSet(sum(self._list_files(), [])))
+
+    def get_dependency_graph(self) -> DependencyGraph:
+        logger.info("Generating theorem hierarchy graph from the theory data "
+                    "in %s of %s...", self.path, self.thm_path)
+
+        dat_files, thm_path_dat_files = self._list_files()
+        all_dat_files = list(OrderedSet(dat_files + thm_path_dat_files))
+
+        # Parsing is CPU bound, so the files are sharded over processes
+        jobs = self.config['jobs']
+        if jobs > 1:
+            logger.info('Reading %d files using %d processes...',
+                        len(all_dat_files), jobs)
+        theory_data = self.cache.map(_read_theory_data_file, all_dat_files,
+                                     jobs, processes=True)
+        self.cache.save()
+
+        # Index the theorems by their (theory, number) id
+        thms_by_id = dict()
+        for data in theory_data:
+            for name, number, _ in data.thms:
+                thms_by_id[(data.theory, number)] = Thm(
+                    thm_id=_id_of_thm_name(name),
+                    file_path=data.file_path,
+                    full_name=name,
+                )
+
+        def node_attrs(thm: Thm):
+            return {
+                'long_name': '::'.join([thm.file_path[:-len(THEORY_DAT)],
+                                        thm.full_name]),
+                'pretty_name': thm.thm_id,
+            }
+
+        # The theorems of THM-ROOT, and the ones they depend on
+        graph = new_dependency_graph(self.config)
+        thm_path_files = set(thm_path_dat_files)
+        unknown_dependencies = 0
+        for data in theory_data:
+            if data.file_path not in thm_path_files:
+                continue
+            for name, number, deps in data.thms:
+                thm = thms_by_id[(data.theory, number)]
+                graph.add_node(thm.thm_id, **node_attrs(thm))
+                for dep_theory, dep_numbers in deps:
+                    for dep_number in dep_numbers:
+                        dep = thms_by_id.get((dep_theory, dep_number))
+                        if dep is None:
+                            unknown_dependencies += 1
+                            continue
+                        if dep.thm_id == thm.thm_id:
+                            continue
+                        if dep.thm_id not in graph:
+                            graph.add_node(dep.thm_id, **node_attrs(dep))
+                        graph.add_edge(thm.thm_id, dep.thm_id)
+
+        if unknown_dependencies:
+            logger.info('Skipped %d dependencies on theorems outside of %s.',
+                        unknown_dependencies, self.path)
+        logger.info("Done.")
+        return graph
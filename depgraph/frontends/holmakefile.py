@@ -0,0 +1,106 @@
+import logging
+import os
+import re
+from typing import Iterator, List
+
+from ..file_index import DEFAULT_EXCLUDED_DIRS
+from ..utils import OrderedSet, parallel_map
+
+logger = logging.getLogger(__name__)
+
+# Discovery of the directories which are part of a Holmake build: starting
+# from the root directory, the INCLUDES and PRE_INCLUDES of each Holmakefile
+# are followed transitively, so the directories which are not part of the
+# build (examples, logs, ...) are never visited.
+
+HOLMAKEFILE = 'Holmakefile'
+
+_includes_regex = re.compile('^\\s*(?:PRE_)?INCLUDES\\s*[+:?]?=(.*)$')
+
+
+def _logical_lines(path: str) -> Iterator[str]:
+    # Lines of the Makefile, with the comments removed and the lines ending
+    # with a backslash joined to the next one
+    parts = []
+    with open(path, 'r', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            comment = line.find('#')
+            if comment >= 0:
+                line = line[:comment]
+            if line.endswith('\\'):
+                parts.append(line[:-1])
+                continue
+            parts.append(line)
+            yield ' '.join(parts)
+            parts = []
+    if parts:
+        yield ' '.join(parts)
+
+
+def read_includes(holmakefile_path: str) -> List[str]:
+    # Directories listed in INCLUDES and PRE_INCLUDES, as written in the
+    # Holmakefile. The ones using a variable (e.g. `$(HOLDIR)/examples`) are
+    # outside of the source tree, and skipped.
+    includes = []
+    for line in _logical_lines(holmakefile_path):
+        match = _includes_regex.match(line)
+        if not match:
+            continue
+        for include in match.group(1).split():
+            if '$' in include:
+                logger.debug('Skipping include "%s" in %s',
+                             include, holmakefile_path)
+                continue
+            includes.append(include)
+    return includes
+
+
+def _included_directories(dir_path: str) -> List[str]:
+    holmakefile_path = os.path.join(dir_path, HOLMAKEFILE)
+    try:
+        includes = read_includes(holmakefile_path)
+    except FileNotFoundError:
+        return []
+    except OSError as e:
+        logger.warning('Cannot read "%s": %s', holmakefile_path, e)
+        return []
+    return [os.path.normpath(os.path.join(dir_path, include))
+            for include in includes]
+
+
+def find_build_directories(root: str, jobs=1,
+                           excluded_dirs=DEFAULT_EXCLUDED_DIRS) -> List[str]:
+    # Directories reachable from `root` through the INCLUDES, `root` first.
+    # They are visited breadth-first, the Holmakefiles of a level being read
+    # in parallel. The included directories outside of `root` are skipped,
+    # like a walk of `root` would.
+    root = os.path.abspath(root)
+    root_prefix = os.path.join(root, '')
+    directories = OrderedSet([root])
+    level = [root]
+    while level:
+        next_level = []
+        included = parallel_map(_included_directories, level, jobs)
+        for dir_path, includes in zip(level, included):
+            for include in includes:
+                if include in directories:
+                    continue
+                if not include.startswith(root_prefix):
+                    logger.debug('Skipping "%s", included by %s: outside of '
+                                 '%s', include, dir_path, root)
+                    continue
+                if set(excluded_dirs).intersection(
+                        os.path.relpath(include, root).split(os.sep)):
+                    continue
+                if not os.path.isdir(include):
+                    logger.warning('Missing directory "%s", included by %s',
+                                   include, dir_path)
+                    continue
+                directories.add(include)
+                next_level.append(include)
+        level = next_level
+
+    logger.debug('Found %d directories in the build of %s',
+                 len(directories), root)
+    return list(directories)
@@ -0,0 +1,96 @@
+import mmap
+import re
+from typing import Iterator, Tuple
+
+# Streaming lexer for SML files. The file is memory-mapped and scanned for
+# the few byte sequences which matter (comment delimiters, string quotes and
+# new lines), so only the current token is ever copied out of the mapping.
+# Comments nest, as in `(* (* *) *)`, and `(*` inside a string literal does
+# not start a comment. New lines may be written as "\n", "\r\n" or "\r".
+
+TOKEN_CODE = 'code'
+TOKEN_STRING = 'string'
+TOKEN_NEWLINE = 'newline'
+
+ENCODING = 'utf-8'
+
+_code_regex = re.compile(b'\\(\\*|"|\r\n?|\n')
+_comment_regex = re.compile(b'\\(\\*|\\*\\)')
+_string_regex = re.compile(b'\\\\[^\r\n]|"|\r\n?|\n')
+_new_lines = {b'\n', b'\r\n', b'\r'}
+
+
+def _decode(data: bytes) -> str:
+    return data.decode(ENCODING, errors='replace')
+
+
+def _tokenize_buffer(buf) -> Iterator[Tuple[str, str]]:
+    pos = 0
+    end = len(buf)
+    comment_depth = 0
+    string_start = None  # start of the current string literal part, if any
+
+    while pos < end:
+        if comment_depth > 0:
+            match = _comment_regex.search(buf, pos)
+            if match is None:  # Unterminated comment
+                return
+            comment_depth += 1 if match.group() == b'(*' else -1
+            pos = match.end()
+
+        elif string_start is not None:
+            match = _string_regex.search(buf, pos)
+            if match is None:  # Unterminated string
+                yield TOKEN_STRING, _decode(buf[string_start:])
+                return
+            token = match.group()
+            if token == b'"':
+                yield TOKEN_STRING, _decode(buf[string_start:match.end()])
+                string_start = None
+            elif token in _new_lines:  # Keep the lines of the file
+                yield TOKEN_STRING, _decode(buf[string_start:match.start()])
+                yield TOKEN_NEWLINE, '\n'
+                string_start = match.end()
+            pos = match.end()
+
+        else:
+            match = _code_regex.search(buf, pos)
+            if match is None:
+                yield TOKEN_CODE, _decode(buf[pos:])
+                return
+            if match.start() > pos:
+                yield TOKEN_CODE, _decode(buf[pos:match.start()])
+            token = match.group()
+            if token in _new_lines:
+                yield TOKEN_NEWLINE, '\n'
+            elif token == b'(*':
+                comment_depth = 1
+            else:
+                string_start = match.start()
+            pos = match.end()
+
+
+def tokenize(path: str) -> Iterator[Tuple[str, str]]:
+    # Yields (kind, text) tokens, comments excluded
+    with open(path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files cannot be mapped
+            return
+        with buf:
+            yield from _tokenize_buffer(buf)
+
+
+def code_lines(path: str) -> Iterator[str]:
+    # Yields the lines of the file with the comments removed. As comments are
+    # dropped with the new lines they contain, the code before and after a
+    # multi-line comment ends up on the same line.
+    parts = []
+    for kind, text in tokenize(path):
+        if kind == TOKEN_NEWLINE:
+            yield ''.join(parts)
+            parts = []
+        else:
+            parts.append(text)
+    if parts:
+        yield ''.join(parts)
@@ -0,0 +1,53 @@
+import logging
+import time
+from argparse import ArgumentParser
+from typing import List
+
+from .frontend import FrontEnd, make_frontend_action
+from ..config import Config
+from ..dependency_graph import DependencyGraph
+from ..graph_cores import GRAPH_CORES
+from ..snapshot import read_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotFrontEnd(FrontEnd):
+    def __init__(self, config: Config, args):
+        self.config = config
+        self.file_path = args[0]
+        super().__init__('Snapshot %s' % self.file_path)
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        parser.add_argument(
+            '--from-snapshot',
+            required=False,
+            action=make_frontend_action(SnapshotFrontEnd,
+                                        nargs=1, metavar='FILE'),
+            help='Read the graph from a snapshot written by --as-snapshot'
+        )
+
+    def watched_files(self) -> List[str]:
+        return [self.file_path]
+
+    def get_dependency_graph(self) -> DependencyGraph:
+        logger.info('Loading the snapshot %s...', self.file_path)
+        start = time.perf_counter()
+        try:
+            snapshot = read_snapshot(self.file_path)
+        except (OSError, ValueError) as e:
+            logger.error('Cannot read the snapshot "%s": %s',
+                         self.file_path, e)
+            exit(1)
+        # The compact core is built from the arrays of the snapshot, while
+        # networkx needs its dicts filled one edge at a time
+        graph = snapshot.to_graph(GRAPH_CORES[self.config['graph-core']])
+        logger.info('Loaded %d nodes and %d edges in %.2fs.',
+                    len(snapshot.names), len(snapshot.targets),
+                    time.perf_counter() - start)
+        if self.config['graph-core'] != 'compact' \
+                and len(snapshot.targets) > 100000:
+            logger.info('Hint: --graph-core compact loads large snapshots '
+                        'faster.')
+        return graph
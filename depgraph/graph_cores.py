@@ -0,0 +1,15 @@
+from collections import OrderedDict
+
+from .compact_graph import CompactDependencyGraph
+from .config import Config
+from .dependency_graph import DependencyGraph
+
+# Implementations of the dependency graph, selected with --graph-core
+GRAPH_CORES = OrderedDict([
+    ('networkx', DependencyGraph),
+    ('compact', CompactDependencyGraph),
+])
+
+
+def new_dependency_graph(config: Config) -> DependencyGraph:
+    return GRAPH_CORES[config['graph-core']]()
@@ -0,0 +1,255 @@
+from collections.abc import Mapping, MutableMapping
+from typing import Iterator, Set, Tuple
+
+import networkx as nx
+
+from .dependency_graph import DependencyGraph, copy_clusters
+from .reachability import ReachabilityIndex
+
+# View of a dependency graph (of any core) with some nodes and edges hidden.
+# Removing nodes or edges from the view only hides them, and the attributes
+# set on the nodes of the view are kept aside, so the base graph is never
+# changed. The middlewares can then run on views of a graph loaded once,
+# e.g. to render several slices of it.
+#
+# A view of a view is a view of the same base graph, whose masks start as
+# copies of the other view's.
+
+
+class _NodeAttrsView(MutableMapping):
+    # Attributes of the base graph, with the ones set in the view on top
+    def __init__(self, view, node):
+        self._view = view
+        self._node = node
+        self._base = view.base.nodes[node]
+
+    def _overrides(self) -> dict:
+        return self._view._overrides.get(self._node, {})
+
+    def __getitem__(self, key):
+        overrides = self._overrides()
+        if key in overrides:
+            return overrides[key]
+        return self._base[key]
+
+    def __setitem__(self, key, value):
+        self._view._overrides.setdefault(self._node, dict())[key] = value
+
+    def __delitem__(self, key):
+        raise NotImplementedError('Cannot delete attributes in a view')
+
+    def __iter__(self):
+        overrides = self._overrides()
+        for key in self._base:
+            yield key
+        for key in overrides:
+            if key not in self._base:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _NodeView(Mapping):
+    def __init__(self, view):
+        self._view = view
+
+    def __call__(self, data=False):
+        return self.items() if data else self
+
+    def __getitem__(self, node):
+        if node not in self:
+            raise KeyError(node)
+        return _NodeAttrsView(self._view, node)
+
+    def __iter__(self):
+        hidden = self._view.hidden
+        for node in self._view.base.nodes:
+            if node not in hidden:
+                yield node
+
+    def __len__(self):
+        return len(self._view.base.nodes) - len(self._view.hidden)
+
+    def __contains__(self, node):
+        return node in self._view.base.nodes and node not in self._view.hidden
+
+
+class _NeighborsView(Mapping):
+    def __init__(self, view, node, reverse: bool):
+        self._view = view
+        self._node = node
+        self._reverse = reverse
+
+    def _edge(self, other) -> Tuple:
+        return (other, self._node) if self._reverse else (self._node, other)
+
+    def __getitem__(self, node):
+        if node not in self:
+            raise KeyError(node)
+        return dict()
+
+    def __iter__(self):
+        view = self._view
+        base = view.base.pred if self._reverse else view.base.succ
+        for other in base[self._node]:
+            if other not in view.hidden \
+                    and self._edge(other) not in view.hidden_edges:
+                yield other
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, node):
+        return node in self._view.nodes and node in iter(self)
+
+
+class _AdjacencyView(Mapping):
+    def __init__(self, view, reverse=False):
+        self._view = view
+        self._reverse = reverse
+
+    def __getitem__(self, node):
+        if node not in self._view.nodes:
+            raise KeyError(node)
+        return _NeighborsView(self._view, node, self._reverse)
+
+    def __iter__(self):
+        return iter(self._view.nodes)
+
+    def __len__(self):
+        return len(self._view.nodes)
+
+    def __contains__(self, node):
+        return node in self._view.nodes
+
+
+class DependencyGraphView:
+    def __init__(self, graph):
+        if isinstance(graph, DependencyGraphView):
+            self.base = graph.base
+            self.hidden = set(graph.hidden)
+            self.hidden_edges = set(graph.hidden_edges)
+            self._overrides = {node: dict(attrs)
+                               for node, attrs in graph._overrides.items()}
+        else:
+            self.base = graph
+            self.hidden = set()
+            self.hidden_edges = set()
+            self._overrides = dict()
+        self.graph = graph.graph
+        self.clusters = copy_clusters(graph.clusters)
+        self._reachability = None
+
+        self.nodes = _NodeView(self)
+        self.adj = self.succ = _AdjacencyView(self)
+        self.pred = _AdjacencyView(self, reverse=True)
+
+    # Masking
+
+    def remove_node(self, node):
+        if node not in self.nodes:
+            raise nx.NetworkXError('The node %s is not in the graph.'
+                                   % (node,))
+        self.remove_nodes_from([node])
+
+    def remove_nodes_from(self, nodes):
+        removed = set(node for node in nodes if node in self.nodes)
+        self.hidden |= removed
+        for node in removed:
+            self._overrides.pop(node, None)
+        for cluster in self.clusters:
+            cluster.discard_nodes(removed)
+        self._reachability = None
+
+    def remove_edge(self, u, v):
+        if not self.has_edge(u, v):
+            raise nx.NetworkXError('The edge %s-%s is not in the graph.'
+                                   % (u, v))
+        self.hidden_edges.add((u, v))
+        self._reachability = None
+
+    def remove_edges_from(self, edges):
+        for u, v in edges:
+            if self.has_edge(u, v):
+                self.hidden_edges.add((u, v))
+        self._reachability = None
+
+    # Queries
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def is_directed(self) -> bool:
+        return True
+
+    def is_multigraph(self) -> bool:
+        return False
+
+    def has_node(self, node) -> bool:
+        return node in self.nodes
+
+    def has_edge(self, u, v) -> bool:
+        return u in self.nodes and v in self.nodes \
+            and (u, v) not in self.hidden_edges and v in self.base.succ[u]
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        return sum(1 for _ in self.edges())
+
+    def edges(self) -> Iterator[Tuple]:
+        return ((u, v) for u in self.nodes for v in self.succ[u])
+
+    def adjacency(self) -> Iterator[Tuple]:
+        return ((node, self.succ[node]) for node in self.nodes)
+
+    def reachability(self) -> ReachabilityIndex:
+        # The index of the base graph is shared by its views until they hide
+        # something
+        if not self.hidden and not self.hidden_edges:
+            return self.base.reachability()
+        if self._reachability is None:
+            names = list(self.nodes)
+            node_ids = {node: i for i, node in enumerate(names)}
+            adjacency = [[node_ids[v] for v in self.succ[node]]
+                         for node in names]
+            self._reachability = ReachabilityIndex(names, node_ids,
+                                                   adjacency.__getitem__)
+        return self._reachability
+
+    def descendants(self, node) -> Set:
+        return self.reachability().descendants(node)
+
+    def ancestors(self, node) -> Set:
+        return self.reachability().ancestors(node)
+
+    # Copies and conversions
+
+    def copy(self):
+        return DependencyGraphView(self)
+
+    def to_graph(self):
+        # The nodes and edges of the view, in a graph of the base's core
+        graph = self.base.__class__(**self.graph)
+        for node, attrs in self.nodes.items():
+            graph.add_node(node, **attrs)
+        graph.add_edges_from(self.edges())
+        graph.clusters = copy_clusters(self.clusters)
+        return graph
+
+    def to_networkx(self) -> DependencyGraph:
+        graph = self.to_graph()
+        if not isinstance(graph, DependencyGraph):
+            graph = graph.to_networkx()
+        return graph
@@ -1,4 +1,6 @@
 from .cluster_regex import ClusterRegex
+from .cluster_regex_file import ClusterRegexFile
+from .condense_cycles import CondenseCycles
 from .highlight_dependencies_of import HighlightDependenciesOf
 from .highlight_dependents_of import HighlightDependentsOf
 from .highlight_leafs import HighlightLeafs
@@ -13,6 +15,8 @@ from .transitive_reduction import TransitiveReduction
 
 MIDDLEWARES = [
     ClusterRegex,
+    ClusterRegexFile,
+    CondenseCycles,
     HighlightDependenciesOf,
     HighlightDependentsOf,
     HighlightLeafs,
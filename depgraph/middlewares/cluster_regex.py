@@ -34,28 +34,17 @@ class ClusterRegex(Middleware):
         cluster_name = '-'.join('/%s/' % r for r in self.regex_list)
         logger.debug("Cluster name: %s", cluster_name)
 
-        cluster_ids = OrderedSet()
-        for regex_str in self.regex_list:
-            logger.debug("Adding nodes with /%s/...", regex_str)
-
-            compiled = re.compile(regex_str)
-            for node_id in dep_graph.nodes:
-                if compiled.search(node_id):
-                    cluster_ids.add(node_id)
+        # A node matching any of the regexes is in the cluster
+        compiled = re.compile('|'.join('(?:%s)' % r for r in self.regex_list))
+        cluster_ids = OrderedSet(node_id for node_id in dep_graph.nodes
+                                 if compiled.search(node_id))
 
         if len(cluster_ids) > 0:
             logger.info('Cluster contains %d nodes.', len(cluster_ids))
-
-            subgraph = dep_graph.__class__()
-            subgraph.add_nodes_from(cluster_ids)
-            subgraph.add_edges_from(
-                (u, v) for (u, v) in dep_graph.edges()
-                if u in subgraph if v in subgraph)
-
-            cluster = Cluster(cluster_name, subgraph)
-            dep_graph.clusters.add(cluster)
+            dep_graph.clusters.add(Cluster(cluster_name, cluster_ids))
         else:
             logger.info('Empty cluster: %s', cluster_name)
 
         logger.info("Done")
         return dep_graph
+
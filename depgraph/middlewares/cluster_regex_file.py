@@ -0,0 +1,104 @@
+import logging
+import re
+from argparse import ArgumentParser
+from typing import List, Tuple
+
+from .middleware import Middleware, make_middleware_action
+from ..config import Config
+from ..dependency_graph import Cluster, DependencyGraph
+from ..utils import OrderedSet
+
+logger = logging.getLogger(__name__)
+
+# Clusters read from a file with one `NAME REGEX` pattern per line (blank
+# lines and lines starting with `#` are skipped). Each node goes to the
+# cluster of the pattern matching it first, i.e. at the lowest position in
+# the node id, or the first of the file for matches at the same position.
+#
+# All the patterns are compiled into one regex, `(?:REGEX)()|...`: the empty
+# group of a pattern closes last when it matches, so `lastindex` tells which
+# pattern matched, with a single search per node.
+
+
+def read_patterns(file_path: str) -> List[Tuple[str, str]]:
+    patterns = []
+    with open(file_path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split(None, 1)
+            if len(parts) < 2:
+                raise ValueError('%s:%d: expected "NAME REGEX"'
+                                 % (file_path, line_number))
+            try:
+                re.compile(parts[1])
+            except re.error as e:
+                raise ValueError('%s:%d: invalid regex: %s'
+                                 % (file_path, line_number, e))
+            patterns.append((parts[0], parts[1]))
+    return patterns
+
+
+def compile_patterns(regexes: List[str]):
+    # Returns the combined regex, and the pattern of each `lastindex`
+    parts = []
+    pattern_of_group = dict()
+    group = 0
+    for i, regex in enumerate(regexes):
+        group += re.compile(regex).groups + 1
+        pattern_of_group[group] = i
+        parts.append('(?:%s)()' % regex)
+    return re.compile('|'.join(parts)), pattern_of_group
+
+
+class ClusterRegexFile(Middleware):
+    def __init__(self, config: Config, args):
+        self.config = config
+        self.file_path = args[0]
+        try:
+            self.patterns = read_patterns(self.file_path)
+        except (OSError, ValueError) as e:
+            logger.error('Cannot read the clusters of "%s": %s',
+                         self.file_path, e)
+            exit(1)
+        super().__init__('Regex clusters of %s' % self.file_path)
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        parser.add_argument(
+            '--cluster-regex-file',
+            required=False,
+            action=make_middleware_action(ClusterRegexFile,
+                                          nargs=1, metavar='FILE'),
+        )
+
+    def cache_key(self) -> str:
+        # The clusters depend on the content of the file
+        return '%s: %r' % (super().cache_key(), self.patterns)
+
+    def transform(self, dep_graph: DependencyGraph) \
+            -> DependencyGraph:
+        logger.info('Clustering nodes with the %d patterns of %s...',
+                    len(self.patterns), self.file_path)
+
+        compiled, pattern_of_group = compile_patterns(
+            [regex for _, regex in self.patterns])
+        members = [OrderedSet() for _ in self.patterns]
+        for node_id in dep_graph.nodes:
+            match = compiled.search(node_id)
+            if match:
+                members[pattern_of_group[match.lastindex]].add(node_id)
+
+        n_clusters = 0
+        for (name, _), node_ids in zip(self.patterns, members):
+            if len(node_ids) == 0:
+                logger.debug('Empty cluster: %s', name)
+                continue
+            dep_graph.clusters.add(Cluster(name, node_ids))
+            n_clusters += 1
+
+        logger.info('Made %d clusters of %d nodes.', n_clusters,
+                    sum(len(node_ids) for node_ids in members))
+        logger.info("Done")
+        return dep_graph
@@ -0,0 +1,82 @@
+import logging
+from argparse import ArgumentParser
+
+from .middleware import Middleware, make_middleware_action
+from ..config import Config
+from ..dependency_graph import DependencyGraph
+from ..utils import OrderedSet
+
+logger = logging.getLogger(__name__)
+
+# Number of components listed in the logs
+MAX_REPORTED = 10
+
+
+class CondenseCycles(Middleware):
+    works_on_views = False
+
+    def __init__(self, config: Config, _args):
+        super().__init__('Condense cycles')
+        self.config = config
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        parser.add_argument(
+            '--condense-cycles',
+            required=False,
+            action=make_middleware_action(CondenseCycles),
+        )
+
+    def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
+        logger.info("Condensing cycles...")
+
+        # The strongly connected components of the reachability index.
+        # Each one is merged into its first node, in the order of the graph.
+        index = dep_graph.reachability()
+        position = {node: i for i, node in enumerate(dep_graph.nodes)}
+        components = []
+        for members in index.components:
+            if len(members) > 1:
+                components.append(sorted((index.names[v] for v in members),
+                                         key=position.__getitem__))
+        representative = {node: members[0]
+                          for members in components for node in members}
+
+        # The edges of the merged nodes are moved to their representative.
+        # The graph is only read until then, and changed in batches after.
+        edges = OrderedSet()
+        for members in components:
+            head = members[0]
+            for node in members[1:]:
+                edges |= ((head, representative.get(s, s))
+                          for s in dep_graph.succ[node])
+                edges |= ((representative.get(p, p), head)
+                          for p in dep_graph.pred[node])
+                for cluster in dep_graph.clusters:
+                    if node in cluster and head not in cluster:
+                        cluster.add_node(head)
+        self_loops = [node for node in dep_graph.nodes
+                      if node in dep_graph.succ[node]
+                      and representative.get(node, node) == node]
+
+        dep_graph.remove_nodes_from(node for node in representative
+                                    if representative[node] != node)
+        dep_graph.remove_edges_from((node, node) for node in self_loops)
+        dep_graph.add_edges_from((u, v) for u, v in edges if u != v)
+        for members in components:
+            attrs = dep_graph.nodes[members[0]]
+            attrs['members'] = members
+            attrs['pretty_name'] = '%s (+%d)' % (
+                attrs.get('pretty_name', members[0]), len(members) - 1)
+
+        logger.info('Condensed %d cycles of %d nodes, and removed %d '
+                    'self-loops.', len(components), len(representative),
+                    len(self_loops))
+        for members in sorted(components, key=len,
+                              reverse=True)[:MAX_REPORTED]:
+            logger.info(' - %d nodes: %s', len(members), ', '.join(
+                '"%s"' % node for node in members[:5])
+                + (', ...' if len(members) > 5 else ''))
+
+        logger.info("Done.")
+        return dep_graph
@@ -1,22 +1,21 @@
 import logging
 from argparse import ArgumentParser
+from typing import Set
 
-import networkx as nx
-
-from .middleware import Middleware, make_middleware_action
+from .middleware import (
+    NodeHighlighter, check_node_exists, make_middleware_action)
 from ..config import Config
 from ..dependency_graph import DependencyGraph
 
 logger = logging.getLogger(__name__)
 
 
-class HighlightDependentsOf(Middleware):
+class HighlightDependentsOf(NodeHighlighter):
     def __init__(self, config: Config, args):
         self.config = config
         self.root = args[0]
-        self.color = args[1]
         super().__init__('Highlight dependents of "%s" in %s'
-                         % (self.root, self.color))
+                         % (self.root, args[1]), args[1])
 
     @staticmethod
     def install_arg_parser(parser: ArgumentParser):
@@ -28,18 +27,12 @@ class HighlightDependentsOf(Middleware):
                                           metavar=('NODE', 'COLOR')),
         )
 
-    def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
+    def selection_key(self):
+        return self.__class__, self.root
+
+    def nodes_to_highlight(self, dep_graph: DependencyGraph, removed: Set) \
+            -> Set:
         logger.info('Highlighting dependents of "%s" in %s...',
                     self.root, self.color)
-
-        if self.root not in dep_graph:
-            logger.error('No node "%s" in the graph.', self.root)
-            exit(1)
-
-        attr = {'color': self.color}
-        nx.set_node_attributes(dep_graph, {self.root: attr})
-        for dependent in nx.ancestors(dep_graph, self.root):
-            nx.set_node_attributes(dep_graph, {dependent: attr})
-
-        logger.info("Done.")
-        return dep_graph
+        check_node_exists(dep_graph, removed, self.root)
+        return {self.root} | (dep_graph.ancestors(self.root) - removed)
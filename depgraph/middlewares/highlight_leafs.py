@@ -1,20 +1,24 @@
 import logging
 from argparse import ArgumentParser
+from typing import Set
 
-import networkx as nx
-
-from .middleware import Middleware, make_middleware_action
+from .middleware import (
+    NodeHighlighter, make_middleware_action, peel_layers)
 from ..config import Config
 from ..dependency_graph import DependencyGraph
 
 logger = logging.getLogger(__name__)
 
 
-class HighlightLeafs(Middleware):
-    def __init__(self, config: Config, args):
+class HighlightLeafs(NodeHighlighter):
+    def __init__(self, config: Config, args, depth=1):
         self.config = config
-        self.color = args[0]
-        super().__init__('Highlight leaf nodes in %s' % self.color)
+        self.depth = depth
+        if depth > 1:
+            super().__init__('Highlight %d layers of leaf nodes in %s'
+                             % (depth, args[0]), args[0])
+        else:
+            super().__init__('Highlight leaf nodes in %s' % args[0], args[0])
 
     @staticmethod
     def install_arg_parser(parser: ArgumentParser):
@@ -26,16 +30,10 @@ class HighlightLeafs(Middleware):
                                           metavar='COLOR'),
         )
 
-    def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
-        logger.info("Highlighting leaf nodes in %s...", self.color)
-
-        node_ids = []
-        for node_id in dep_graph.nodes:
-            if len(nx.descendants(dep_graph, node_id)) == 0:
-                node_ids.append(node_id)
+    def selection_key(self):
+        return self.__class__, self.depth
 
-        attrs = {node_id: {'color': self.color} for node_id in node_ids}
-        nx.set_node_attributes(dep_graph, attrs)
-
-        logger.info("Done.")
-        return dep_graph
+    def nodes_to_highlight(self, dep_graph: DependencyGraph, removed: Set) \
+            -> Set:
+        logger.info("Highlighting leaf nodes in %s...", self.color)
+        return peel_layers(dep_graph, removed, self.depth)
@@ -1,16 +1,16 @@
 import logging
 from argparse import ArgumentParser
+from typing import Set
 
-import networkx as nx
-
-from .middleware import Middleware, make_middleware_action
+from .middleware import (
+    NodeFilter, check_node_exists, in_cycle, make_middleware_action)
 from ..config import Config
 from ..dependency_graph import DependencyGraph
 
 logger = logging.getLogger(__name__)
 
 
-class KeepOnlyDependentsOf(Middleware):
+class KeepOnlyDependentsOf(NodeFilter):
     def __init__(self, config: Config, args):
         self.config = config
         self.root = args[0]
@@ -25,16 +25,14 @@ class KeepOnlyDependentsOf(Middleware):
                                           nargs=1, metavar='NODE'),
         )
 
-    def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
-        logger.info("Keeping only dependents of %s...", self.root)
-
-        if self.root not in dep_graph:
-            logger.error('No node "%s" in the graph.', self.root)
-            exit(1)
+    def removes_closed_set(self, dep_graph: DependencyGraph, removed: Set) \
+            -> bool:
+        return not in_cycle(dep_graph, removed, self.root)
 
-        dependents = nx.ancestors(dep_graph, self.root)
-        dep_graph.remove_nodes_from(
-            n for n in list(dep_graph.nodes) if n not in dependents)
-
-        logger.info("Done.")
-        return dep_graph
+    def nodes_to_remove(self, dep_graph: DependencyGraph, removed: Set) \
+            -> Set:
+        logger.info("Keeping only dependents of %s...", self.root)
+        check_node_exists(dep_graph, removed, self.root)
+        dependents = dep_graph.ancestors(self.root)
+        return set(n for n in dep_graph.nodes
+                   if n not in dependents and n not in removed)
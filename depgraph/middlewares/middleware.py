@@ -1,11 +1,24 @@
 import abc
+import argparse
+import functools
+import inspect
+import logging
 from argparse import ArgumentParser
+from typing import Hashable, Set
+
+import networkx as nx
 
 from ..config import make_pipeline_action
 from ..dependency_graph import DependencyGraph
 
+logger = logging.getLogger(__name__)
+
 
 class Middleware(metaclass=abc.ABCMeta):
+    # Whether the middleware only removes nodes or edges, and sets node
+    # attributes, so it can run on a DependencyGraphView
+    works_on_views = True
+
     def __init__(self, name):
         self.middleware_name = name
 
@@ -18,6 +31,138 @@ class Middleware(metaclass=abc.ABCMeta):
     def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
         raise NotImplementedError()
 
+    def cache_key(self) -> str:
+        # Identifies what the middleware does, for the stage cache: the names
+        # of the middlewares hold their arguments
+        return '%s: %s' % (type(self).__name__, self.middleware_name)
+
+
+# The node filters and highlighters select nodes in `dep_graph` as if the
+# nodes in `removed` were not there. This is exact as long as the removed
+# nodes form a set closed under successors or under predecessors, since no
+# path between two remaining nodes can then go through a removed node. The
+# node filters remove such sets, unless `removes_closed_set` says otherwise.
+# Several of them can then be evaluated on the same graph (and reachability
+# index), and their changes applied at once (see pipeline.plan_pipeline).
+
+
+class NodeFilter(Middleware):
+    def removes_closed_set(self, dep_graph: DependencyGraph, removed: Set) \
+            -> bool:
+        return True
+
+    @abc.abstractmethod
+    def nodes_to_remove(self, dep_graph: DependencyGraph, removed: Set) \
+            -> Set:
+        raise NotImplementedError()
+
+    def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
+        dep_graph.remove_nodes_from(self.nodes_to_remove(dep_graph, set()))
+        logger.info("Done.")
+        return dep_graph
+
+
+class NodeHighlighter(Middleware):
+    def __init__(self, name, color):
+        super().__init__(name)
+        self.color = color
+
+    @abc.abstractmethod
+    def nodes_to_highlight(self, dep_graph: DependencyGraph, removed: Set) \
+            -> Set:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def selection_key(self) -> Hashable:
+        # Two highlighters with the same key select the same nodes
+        raise NotImplementedError()
+
+    def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
+        attr = {'color': self.color}
+        nx.set_node_attributes(dep_graph, {
+            node_id: attr
+            for node_id in self.nodes_to_highlight(dep_graph, set())})
+        logger.info("Done.")
+        return dep_graph
+
+
+def check_node_exists(dep_graph: DependencyGraph, removed: Set, node_id):
+    if node_id not in dep_graph or node_id in removed:
+        logger.error('No node "%s" in the graph.', node_id)
+        exit(1)
+
+
+def in_cycle(dep_graph: DependencyGraph, removed: Set, node_id) -> bool:
+    # Whether the node is in a cycle with other nodes. Its descendants (or
+    # ancestors) then include the other nodes of the cycle, but not itself.
+    return any(n != node_id and n not in removed
+               for n in dep_graph.reachability().component(node_id))
+
+
+def peel_layers(dep_graph: DependencyGraph, removed: Set, depth: int,
+                reverse=False, keep_ids=()) -> Set:
+    # Nodes of the first `depth` layers of leaves (or roots if `reverse`),
+    # as if `removed` were not there: a node is in the next layer once all
+    # its successors (self-loops aside) are peeled. Kahn-style, the number
+    # of remaining successors of each node is counted once, and decremented
+    # when one of them is peeled. The nodes of `keep_ids` are never peeled.
+    successors = dep_graph.pred if reverse else dep_graph.succ
+    predecessors = dep_graph.succ if reverse else dep_graph.pred
+    keep_ids = set(keep_ids)
+
+    degrees = dict()
+    layer = []
+    for node_id in dep_graph.nodes:
+        if node_id in removed:
+            continue
+        degree = sum(1 for s in successors[node_id]
+                     if s != node_id and s not in removed)
+        degrees[node_id] = degree
+        if degree == 0 and node_id not in keep_ids:
+            layer.append(node_id)
+
+    peeled = set()
+    for _ in range(depth):
+        if not layer:
+            break
+        peeled.update(layer)
+        next_layer = []
+        for node_id in layer:
+            for p in predecessors[node_id]:
+                if p == node_id or p not in degrees:
+                    continue
+                degrees[p] -= 1
+                if degrees[p] == 0 and p not in keep_ids:
+                    next_layer.append(p)
+        layer = next_layer
+    return peeled
+
+
+def check_keep_ids(dep_graph: DependencyGraph, keep_ids):
+    for node_id in keep_ids:
+        if node_id not in dep_graph:
+            logger.warning('No node "%s" to keep in the graph.', node_id)
+
+
+def make_depth_action():
+    # `--depth N` applies to the previous middleware, which must take a
+    # `depth` argument
+    class DepthAction(argparse.Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            stages = getattr(namespace, 'middlewares', None)
+            if not stages or 'depth' not in inspect.signature(
+                    stages[-1][1]).parameters:
+                parser.error('%s must follow --remove-leafs, --remove-roots, '
+                             '--highlight-leafs or --highlight-roots'
+                             % option_string)
+            if values < 1:
+                parser.error('%s must be at least 1' % option_string)
+            dest, action_class, args = stages[-1]
+            stages[-1] = (dest, functools.partial(action_class, depth=values),
+                          args)
+
+    return DepthAction
+
 
 def make_middleware_action(action_class, **kwargs):
     return make_pipeline_action('middlewares', action_class, **kwargs)
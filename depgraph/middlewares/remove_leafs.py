@@ -1,23 +1,27 @@
 import logging
 from argparse import ArgumentParser
+from typing import Set
 
-import networkx as nx
-
-from .middleware import Middleware, make_middleware_action
+from .middleware import (
+    NodeFilter, check_keep_ids, make_middleware_action, peel_layers)
 from ..config import Config
 from ..dependency_graph import DependencyGraph
 
 logger = logging.getLogger(__name__)
 
 
-class RemoveLeafs(Middleware):
-    def __init__(self, config: Config, args):
+class RemoveLeafs(NodeFilter):
+    def __init__(self, config: Config, args, depth=1):
         self.keep_ids = args
+        self.depth = depth
+        name = 'Remove leaf nodes'
+        if depth > 1:
+            name = 'Remove %d layers of leaf nodes' % depth
         if len(self.keep_ids) == 0:
-            super().__init__('Remove leaf nodes')
+            super().__init__(name)
         else:
-            super().__init__('Remove leaf nodes but [%s]'
-                             % ', '.join('"%s"' % x for x in self.keep_ids))
+            super().__init__('%s but [%s]' % (
+                name, ', '.join('"%s"' % x for x in self.keep_ids)))
         self.config = config
 
     @staticmethod
@@ -30,19 +34,14 @@ class RemoveLeafs(Middleware):
                                           metavar='KEEP_ID'),
         )
 
-    def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
+    def nodes_to_remove(self, dep_graph: DependencyGraph, removed: Set) \
+            -> Set:
         if len(self.keep_ids) == 0:
             logger.info("Removing leaf nodes...")
         else:
             logger.info("Removing leaf nodes except [%s]...",
                         ', '.join('"%s"' % x for x in self.keep_ids))
 
-        node_ids = []
-        for node_id in dep_graph.nodes:
-            if len(nx.descendants(dep_graph, node_id)) == 0:
-                node_ids.append(node_id)
-
-        dep_graph.remove_nodes_from(node_ids)
-
-        logger.info("Done.")
-        return dep_graph
+        check_keep_ids(dep_graph, self.keep_ids)
+        return peel_layers(dep_graph, removed, self.depth,
+                           keep_ids=self.keep_ids)
@@ -1,23 +1,27 @@
 import logging
 from argparse import ArgumentParser
+from typing import Set
 
-import networkx as nx
-
-from .middleware import Middleware, make_middleware_action
+from .middleware import (
+    NodeFilter, check_keep_ids, make_middleware_action, peel_layers)
 from ..config import Config
 from ..dependency_graph import DependencyGraph
 
 logger = logging.getLogger(__name__)
 
 
-class RemoveRoots(Middleware):
-    def __init__(self, config: Config, args):
+class RemoveRoots(NodeFilter):
+    def __init__(self, config: Config, args, depth=1):
         self.keep_ids = args
+        self.depth = depth
+        name = 'Remove root nodes'
+        if depth > 1:
+            name = 'Remove %d layers of root nodes' % depth
         if len(self.keep_ids) == 0:
-            super().__init__('Remove root nodes')
+            super().__init__(name)
         else:
-            super().__init__('Remove root nodes but [%s]'
-                             % ', '.join('"%s"' % x for x in self.keep_ids))
+            super().__init__('%s but [%s]' % (
+                name, ', '.join('"%s"' % x for x in self.keep_ids)))
         self.config = config
 
     @staticmethod
@@ -30,19 +34,14 @@ class RemoveRoots(Middleware):
                                           metavar='KEEP_ID'),
         )
 
-    def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
+    def nodes_to_remove(self, dep_graph: DependencyGraph, removed: Set) \
+            -> Set:
         if len(self.keep_ids) == 0:
             logger.info("Removing root nodes...")
         else:
             logger.info("Removing root nodes except [%s]...",
                         ', '.join('"%s"' % x for x in self.keep_ids))
 
-        node_ids = []
-        for node_id in dep_graph.nodes:
-            if len(nx.ancestors(dep_graph, node_id)) == 0:
-                node_ids.append(node_id)
-
-        dep_graph.remove_nodes_from(node_ids)
-
-        logger.info("Done.")
-        return dep_graph
+        check_keep_ids(dep_graph, self.keep_ids)
+        return peel_layers(dep_graph, removed, self.depth, reverse=True,
+                           keep_ids=self.keep_ids)
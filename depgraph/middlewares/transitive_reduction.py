@@ -1,4 +1,5 @@
 import logging
+import time
 from argparse import ArgumentParser
 
 import networkx as nx
@@ -6,6 +7,7 @@ import networkx as nx
 from .middleware import Middleware, make_middleware_action
 from ..config import Config
 from ..dependency_graph import DependencyGraph
+from ..reduction import redundant_edges, topological_order
 
 logger = logging.getLogger(__name__)
 
@@ -25,23 +27,30 @@ class TransitiveReduction(Middleware):
 
     def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
         logger.info("Computing transitive reduction...")
+        start = time.perf_counter()
 
-        if not nx.is_directed_acyclic_graph(dep_graph):
+        order = topological_order(dep_graph)
+        if order is None:
             logger.critical(
                 "Directed Acyclic Graph required for transitive_reduction.")
 
+            # The networkx algorithms need a networkx graph
+            if not isinstance(dep_graph, nx.DiGraph):
+                dep_graph = dep_graph.to_networkx()
             cycle = nx.find_cycle(dep_graph)
             logger.critical('Cycle found: %s', cycle)
+            logger.critical('Use --condense-cycles before to merge the '
+                            'cycles into single nodes.')
 
             exit(1)
 
-        reduced = nx.algorithms.transitive_reduction(dep_graph)
-
-        if not isinstance(reduced, DependencyGraph):
-            logger.critical('You should apply the patch fixing '
-                            'networkx.transitive_reduction.')
-        else:
-            reduced.clusters = dep_graph.clusters
+        # The graph is reduced in place, so it keeps its type, its node
+        # attributes and its clusters
+        redundant, memory = redundant_edges(dep_graph, order)
+        dep_graph.remove_edges_from(redundant)
 
+        logger.info('Removed %d redundant edges in %.2fs, using %.1f MiB '
+                    'of bitsets.', len(redundant),
+                    time.perf_counter() - start, memory / 2 ** 20)
         logger.info("Done.")
-        return reduced
+        return dep_graph
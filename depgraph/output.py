@@ -0,0 +1,105 @@
+import gzip
+import logging
+import lzma
+import os
+import sys
+import tempfile
+import time
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# The output of the backends goes through here as chunks: strings of whole
+# lines, each ending with a newline. The lines are batched into chunks of
+# about CHUNK_SIZE characters, so the output is written with a few large
+# writes instead of one per line. The binary backends (e.g. --as-snapshot)
+# give chunks of bytes, which are written as they are.
+
+CHUNK_SIZE = 1 << 20
+
+
+def chunks_of_lines(lines: Iterable) -> Iterator[str]:
+    batch = []
+    size = 0
+    for line in lines:
+        line = '%s\n' % line
+        batch.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(batch)
+            batch = []
+            size = 0
+    if batch:
+        yield ''.join(batch)
+
+
+def _compressed(raw, path: str):
+    # The compression is chosen by the extension of the output file
+    if path.endswith('.gz'):
+        return gzip.GzipFile(filename=os.path.basename(path)[:-3],
+                             mode='wb', fileobj=raw)
+    if path.endswith('.xz'):
+        return lzma.LZMAFile(raw, mode='wb')
+    return raw
+
+
+def _file_mode(path: str) -> int:
+    # The mode of the file being replaced, or the default one for a new file
+    # (mkstemp creates the temporary file readable by its owner only)
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def _report(path: str, written: int, size: int, start: float):
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    if size != written:
+        logger.info('Wrote %s: %d bytes (%d compressed) in %.2fs, %.1f MB/s.',
+                    path, written, size, elapsed, written / elapsed / 1e6)
+    else:
+        logger.info('Wrote %s: %d bytes in %.2fs, %.1f MB/s.',
+                    path, written, elapsed, written / elapsed / 1e6)
+
+
+def write_output_file(chunks: Iterable[str], path: str):
+    # Write the chunks to a temporary file next to `path`, then rename it, so
+    # that readers of `path` never see a partially written file.
+    start = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix='.%s.' % os.path.basename(path))
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            stream = _compressed(raw, path)
+            for chunk in chunks:
+                data = chunk if isinstance(chunk, bytes) \
+                    else chunk.encode('utf-8')
+                stream.write(data)
+                written += len(data)
+            if stream is not raw:
+                stream.close()
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _report(path, written, os.path.getsize(path), start)
+
+
+def write_output_stdout(chunks: Iterable[str]):
+    start = time.perf_counter()
+    written = 0
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            sys.stdout.flush()
+            sys.stdout.buffer.write(chunk)
+        else:
+            sys.stdout.write(chunk)
+        written += len(chunk)
+    sys.stdout.flush()
+    logger.debug('Wrote %d characters or bytes to stdout in %.2fs.',
+                 written, time.perf_counter() - start)
@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from typing import Callable, List, Any
+
+from .config import Config
+from .utils import parallel_map
+
+logger = logging.getLogger(__name__)
+
+# Bump this when the format of the cached results changes
+CACHE_VERSION = 2
+
+# Caches written by older versions, deleted when a cache is saved next to them
+OBSOLETE_CACHE_NAMES = ('hol4-thms-names', 'hol4-thms-deps')
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    # On-disk cache of per-file parse results. Each entry is keyed by the file
+    # path, and is reused if the size and mtime of the file did not change.
+    # With `check_hash`, an entry whose size or mtime changed is still reused
+    # if the content hash of the file is the same (e.g. after a `touch`).
+    #
+    # The entries of the files which were not asked for since the previous
+    # save are evicted when saving.
+    #
+    # Without `cache_dir`, the cache does nothing, unless `keep_in_memory` is
+    # set: the entries then live as long as the cache object (see --watch).
+
+    def __init__(self, cache_dir: str, name: str, check_hash=False,
+                 keep_in_memory=False):
+        self.name = name
+        self.check_hash = check_hash
+        self.keep_in_memory = keep_in_memory
+        self.path = None
+        if cache_dir is not None:
+            self.path = os.path.join(cache_dir, '%s.cache' % name)
+        self.entries = dict()
+        self.hits = 0
+        self.misses = 0
+        self._used = set()
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def from_config(config: Config, name: str):
+        return ParseCache(config['cache-dir'], name,
+                          check_hash=config['cache-check-hash'],
+                          keep_in_memory=config['watch'])
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None or self.keep_in_memory
+
+    def _load(self):
+        if self.path is None or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                version, entries = pickle.load(f)
+        except (OSError, EOFError, ValueError, TypeError,
+                pickle.UnpicklingError) as e:
+            logger.warning('Ignoring unreadable cache "%s": %s', self.path, e)
+            return
+        if version != CACHE_VERSION:
+            logger.info('Discarding outdated cache "%s".', self.path)
+            self._dirty = True
+            return
+        self.entries = entries
+
+    def _lookup(self, path: str):
+        # Returns (stamp, entry) where `entry` is None if the cached result
+        # can't be reused. The file is only hashed if its stamp changed.
+        stat = os.stat(path)
+        stamp = (stat.st_size, stat.st_mtime_ns, None)
+        entry = self.entries.get(path)
+        if entry is not None and entry[:2] == stamp[:2]:
+            return entry[:3], entry
+        if self.check_hash:
+            stamp = stamp[:2] + (_file_digest(path),)
+            if entry is not None and entry[2] == stamp[2]:
+                self.entries[path] = stamp + (entry[3],)
+                self._dirty = True
+                return stamp, entry
+        return stamp, None
+
+    def map(self, func: Callable[[str], Any], paths: List[str], jobs=1,
+            processes=False) -> List[Any]:
+        # Same as `parallel_map(func, paths, jobs, processes)`, but only calls
+        # `func` on the files which are not in the cache.
+        if not self.enabled:
+            return parallel_map(func, paths, jobs, processes)
+
+        self._used.update(paths)
+        results = [None] * len(paths)
+        lookups = parallel_map(self._lookup, paths, jobs)
+        stamps = []
+        todo = []
+        for i, (stamp, entry) in enumerate(lookups):
+            stamps.append(stamp)
+            if entry is not None:
+                results[i] = entry[3]
+            else:
+                todo.append(i)
+
+        self.hits += len(paths) - len(todo)
+        self.misses += len(todo)
+        if todo:
+            self._dirty = True
+            computed = parallel_map(func, [paths[i] for i in todo], jobs,
+                                    processes)
+            for i, result in zip(todo, computed):
+                self.entries[paths[i]] = stamps[i] + (result,)
+                results[i] = result
+        return results
+
+    def _evict_unused(self):
+        unused = [path for path in self.entries if path not in self._used]
+        for path in unused:
+            del self.entries[path]
+        self._used = set()
+        if unused:
+            self._dirty = True
+            logger.debug('Evicted %d unused entries from "%s".',
+                         len(unused), self.path)
+
+    def _remove_obsolete_caches(self, cache_dir: str):
+        for name in OBSOLETE_CACHE_NAMES:
+            path = os.path.join(cache_dir, '%s.cache' % name)
+            if os.path.isfile(path):
+                logger.info('Removing obsolete cache "%s".', path)
+                os.unlink(path)
+
+    def save(self):
+        if not self.enabled:
+            return
+        logger.info('Cache "%s": %d hits, %d misses.',
+                    self.name, self.hits, self.misses)
+        self._evict_unused()
+        if self.path is None or not self._dirty:
+            return
+
+        cache_dir = os.path.dirname(self.path)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._remove_obsolete_caches(cache_dir)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((CACHE_VERSION, self.entries), f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._dirty = False
@@ -0,0 +1,134 @@
+import logging
+from argparse import ArgumentParser
+from typing import Iterable, List
+
+import networkx as nx
+
+from .backends.backend import BackEnd
+from .dependency_graph import DependencyGraph
+from .graph_view import DependencyGraphView
+from .middlewares.middleware import Middleware, NodeFilter, NodeHighlighter
+
+logger = logging.getLogger(__name__)
+
+
+class FusedStage(Middleware):
+    # Consecutive node filters and highlighters, evaluated on the same graph
+    # (see NodeFilter): the nodes are removed and highlighted once at the
+    # end, so the reachability index is usually built once for all of them,
+    # and the colors of nodes removed by a later filter are never set.
+    def __init__(self, middlewares: List[Middleware], dropped=()):
+        super().__init__('Fused pass')
+        self.dropped = list(dropped)
+        self.middlewares = [m for m in middlewares if m not in self.dropped]
+        self.planned = middlewares
+
+    @staticmethod
+    def install_arg_parser(parser: ArgumentParser):
+        raise NotImplementedError()
+
+    def cache_key(self) -> str:
+        return '\n'.join(middleware.cache_key()
+                         for middleware in self.middlewares)
+
+    def transform(self, dep_graph: DependencyGraph) -> DependencyGraph:
+        removed = set()
+        colors = dict()
+        for middleware in self.middlewares:
+            if isinstance(middleware, NodeFilter):
+                nodes = middleware.nodes_to_remove(dep_graph, removed)
+                closed = middleware.removes_closed_set(dep_graph, removed)
+                removed |= nodes
+                if not closed:  # The next stages need the real graph
+                    dep_graph.remove_nodes_from(removed)
+                    removed = set()
+            else:
+                for node_id in middleware.nodes_to_highlight(dep_graph,
+                                                             removed):
+                    colors[node_id] = middleware.color
+
+        logger.info('Removing %d nodes and highlighting %d nodes...',
+                    len(removed), len(colors))
+        dep_graph.remove_nodes_from(removed)
+        nx.set_node_attributes(dep_graph, {
+            node_id: {'color': color} for node_id, color in colors.items()
+            if node_id in dep_graph})
+        logger.info("Done.")
+        return dep_graph
+
+
+def _is_fusable(middleware: Middleware) -> bool:
+    return isinstance(middleware, (NodeFilter, NodeHighlighter))
+
+
+def _overwritten(middlewares: List[Middleware]) -> List[Middleware]:
+    # A highlighter is useless if a later one selects the same nodes with no
+    # filter in between, since the later color wins
+    dropped = []
+    later_keys = set()
+    for middleware in reversed(middlewares):
+        if isinstance(middleware, NodeFilter):
+            later_keys = set()
+            continue
+        key = middleware.selection_key()
+        if key in later_keys:
+            dropped.append(middleware)
+        later_keys.add(key)
+    return dropped
+
+
+def plan_pipeline(middlewares: List[Middleware]) -> List[Middleware]:
+    # Groups the runs of consecutive node filters and highlighters into
+    # fused stages. The other middlewares (clusters, transitive reduction)
+    # run on their own, in order.
+    plan = []
+    run = []
+
+    def flush():
+        if len(run) == 1:
+            plan.append(run[0])
+        elif run:
+            plan.append(FusedStage(list(run), _overwritten(run)))
+        run.clear()
+
+    for middleware in middlewares:
+        if _is_fusable(middleware):
+            run.append(middleware)
+        else:
+            flush()
+            plan.append(middleware)
+    flush()
+    return plan
+
+
+def describe_plan(plan: List[Middleware]) -> List[str]:
+    lines = []
+    for i, stage in enumerate(plan):
+        lines.append('%d. %s' % (i + 1, stage.middleware_name))
+        if isinstance(stage, FusedStage):
+            for middleware in stage.planned:
+                if middleware in stage.dropped:
+                    lines.append('   - %s (dropped: overwritten by a later '
+                                 'stage)' % middleware.middleware_name)
+                else:
+                    lines.append('   - %s' % middleware.middleware_name)
+    return lines
+
+
+def run_pipeline(dep_graph: DependencyGraph, middlewares: List[Middleware],
+                 backend: BackEnd, views=False) -> Iterable:
+    # With `views`, the middlewares work on a view of the graph, which is
+    # left unchanged. A middleware which can't work on a view gets a copy
+    # of it instead.
+    if views:
+        dep_graph = DependencyGraphView(dep_graph)
+
+    # Transform it using middlewares
+    for middleware in middlewares:
+        if isinstance(dep_graph, DependencyGraphView) \
+                and not middleware.works_on_views:
+            dep_graph = dep_graph.to_graph()
+        dep_graph = middleware.transform(dep_graph)
+
+    # Get the output from the backend
+    return backend.convert_chunks(dep_graph)
@@ -0,0 +1,178 @@
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Set
+
+import networkx as nx
+
+# Index answering descendants/ancestors queries on a graph which doesn't
+# change. The strongly connected components (SCC) are computed once, and the
+# queries walk the condensation DAG, whose nodes are numbered in reverse
+# topological order. The components reached are collected in a bitset, and
+# the bitsets of the last queried components are kept, so that later
+# queries stop where they meet them.
+#
+# The graph is given as integer ids: `node_ids` maps the node names to ids
+# below `len(names)`, and `successors(id)` gives the ids of the successors.
+
+# Number of bitsets kept for each direction
+MAX_MEMOIZED = 1024
+
+_nonzero_byte_regex = re.compile(b'[^\\x00]')
+
+
+def _strongly_connected_components(ids: Iterable[int], n: int,
+                                   successors: Callable[[int], Iterable[int]]):
+    # Iterative Tarjan: returns (component of each id, members of each
+    # component). A component comes after all the ones it can reach.
+    index = [-1] * n
+    low = [0] * n
+    on_stack = bytearray(n)
+    component_of = [-1] * n
+    components = []
+    stack = []
+    counter = 0
+
+    for root in ids:
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, iter(successors(root)))]
+        while work:
+            v, neighbors = work[-1]
+            for w in neighbors:
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    work.append((w, iter(successors(w))))
+                    break
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if work and low[v] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[v]
+                if low[v] == index[v]:
+                    members = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        component_of[w] = len(components)
+                        members.append(w)
+                        if w == v:
+                            break
+                    components.append(members)
+
+    return component_of, components
+
+
+def _bit_indices(bits: int) -> Iterator[int]:
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for match in _nonzero_byte_regex.finditer(data):
+        base = match.start() * 8
+        byte = data[match.start()]
+        while byte:
+            lowest = byte & -byte
+            yield base + lowest.bit_length() - 1
+            byte ^= lowest
+
+
+class ReachabilityIndex:
+    def __init__(self, names: List, node_ids: Dict[object, int],
+                 successors: Callable[[int], Iterable[int]]):
+        self.names = names
+        self.node_ids = node_ids
+        self.component_of, self.components = _strongly_connected_components(
+            node_ids.values(), len(names), successors)
+
+        # Edges of the condensation, in both directions
+        n_components = len(self.components)
+        self.successors = [[] for _ in range(n_components)]
+        self.predecessors = [[] for _ in range(n_components)]
+        for c, members in enumerate(self.components):
+            targets = set()
+            for v in members:
+                for w in successors(v):
+                    d = self.component_of[w]
+                    if d != c and d not in targets:
+                        targets.add(d)
+                        self.successors[c].append(d)
+                        self.predecessors[d].append(c)
+
+        self._memoized = (OrderedDict(), OrderedDict())
+
+    @staticmethod
+    def of_networkx(graph: nx.DiGraph):
+        names = list(graph.nodes)
+        node_ids = {node: i for i, node in enumerate(names)}
+        adjacency = [[node_ids[v] for v in graph.succ[node]]
+                     for node in names]
+        return ReachabilityIndex(names, node_ids, adjacency.__getitem__)
+
+    def _reachable_components(self, c: int, reverse: bool) -> int:
+        # Bitset of the components reachable from `c`, `c` excluded
+        memoized = self._memoized[reverse]
+        bits = memoized.get(c)
+        if bits is not None:
+            memoized.move_to_end(c)
+            return bits
+
+        edges = self.predecessors if reverse else self.successors
+        n_components = len(self.components)
+        visited = bytearray(n_components)
+        bitmap = bytearray((n_components + 7) // 8)
+        reused = []
+        to_visit = [c]
+        while to_visit:
+            d = to_visit.pop()
+            for e in edges[d]:
+                if visited[e]:
+                    continue
+                visited[e] = 1
+                bitmap[e >> 3] |= 1 << (e & 7)
+                known = memoized.get(e)
+                if known is not None:
+                    reused.append(known)
+                else:
+                    to_visit.append(e)
+
+        bits = int.from_bytes(bitmap, 'little')
+        for known in reused:
+            bits |= known
+        memoized[c] = bits
+        if len(memoized) > MAX_MEMOIZED:
+            memoized.popitem(last=False)
+        return bits
+
+    def _reachable(self, node, reverse: bool) -> Set:
+        node_id = self.node_ids.get(node)
+        if node_id is None:
+            raise nx.NetworkXError('The node %s is not in the graph.'
+                                   % (node,))
+        c = self.component_of[node_id]
+        names = self.names
+        components = self.components
+        # The other members of a cycle reach each other
+        reached = set(names[v] for v in components[c] if v != node_id)
+        for d in _bit_indices(self._reachable_components(c, reverse)):
+            reached.update(names[v] for v in components[d])
+        return reached
+
+    def component(self, node) -> Set:
+        # Nodes of the strongly connected component of `node`, itself included
+        node_id = self.node_ids.get(node)
+        if node_id is None:
+            raise nx.NetworkXError('The node %s is not in the graph.'
+                                   % (node,))
+        members = self.components[self.component_of[node_id]]
+        return set(self.names[v] for v in members)
+
+    def descendants(self, node) -> Set:
+        return self._reachable(node, reverse=False)
+
+    def ancestors(self, node) -> Set:
+        return self._reachable(node, reverse=True)
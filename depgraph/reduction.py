@@ -0,0 +1,64 @@
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .dependency_graph import DependencyGraph
+
+logger = logging.getLogger(__name__)
+
+# Transitive reduction of a DAG with bitsets. The nodes are numbered in
+# topological order, and processed in reverse: the descendants of a node are
+# the union of the descendants of its children, kept as packed bitsets of
+# 64-bit words. The children are visited closest first (in topological
+# order), so an edge to a child is redundant exactly when the child is
+# already among the descendants of the previous children.
+#
+# The bitset of a node is freed once all its parents are processed, so only
+# the bitsets of the current "frontier" of the DAG are kept in memory.
+
+
+def topological_order(dep_graph: DependencyGraph) -> Optional[List]:
+    # Kahn's algorithm, or None if the graph has a cycle
+    in_degrees = {node: len(dep_graph.pred[node]) for node in dep_graph.nodes}
+    order = [node for node, degree in in_degrees.items() if degree == 0]
+    for node in order:  # The list grows while iterating
+        for child in dep_graph.succ[node]:
+            in_degrees[child] -= 1
+            if in_degrees[child] == 0:
+                order.append(child)
+    if len(order) < len(in_degrees):
+        return None
+    return order
+
+
+def redundant_edges(dep_graph: DependencyGraph, order: List) \
+        -> Tuple[List[Tuple], int]:
+    # Edges which are not in the transitive reduction, and the peak memory
+    # used by the bitsets (in bytes)
+    position = {node: i for i, node in enumerate(order)}
+    n_words = (len(order) + 63) // 64
+    parents_left = [len(dep_graph.pred[node]) for node in order]
+    reach = [None] * len(order)
+    redundant = []
+    live = peak = 0
+
+    for i in reversed(range(len(order))):
+        node = order[i]
+        bits = np.zeros(n_words, dtype=np.uint64)
+        for j in sorted(position[child] for child in dep_graph.succ[node]):
+            if (int(bits[j >> 6]) >> (j & 63)) & 1:
+                redundant.append((node, order[j]))
+            else:
+                np.bitwise_or(bits, reach[j], out=bits)
+                bits[j >> 6] |= np.uint64(1 << (j & 63))
+            parents_left[j] -= 1
+            if parents_left[j] == 0:
+                reach[j] = None
+                live -= 1
+        if parents_left[i] > 0:
+            reach[i] = bits
+            live += 1
+            peak = max(peak, live)
+
+    return redundant, peak * n_words * 8
@@ -0,0 +1,277 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+from .dependency_graph import Cluster, DependencyGraph
+from .utils import paused_gc
+
+# Binary snapshot of a dependency graph, written by --as-snapshot and read
+# back by --from-snapshot without parsing any text. All the numbers are
+# little-endian:
+#
+#   header    MAGIC, VERSION (uint32), length of the metadata (uint32)
+#   metadata  JSON: numbers of nodes and edges, graph attributes, names and
+#             kinds of the attribute columns, names of the clusters
+#   arrays    each one as its typecode (1 byte + 7 of padding), its number
+#             of items (uint64) and the items, padded to 8 bytes:
+#     - string table: offsets (q) of the strings in the UTF-8 blob (B), where
+#       they are separated by NUL bytes. The first strings are the node ids,
+#       in the order of the graph, so a node's index is its string id.
+#     - adjacency (CSR): offsets (q, one per node + 1) of the successors of
+#       each node in the targets (i)
+#     - one column (i) per node attribute: the string id of the value of
+#       each node, or -1 without value. The values of the "json" columns are
+#       JSON encoded, those of the "str" columns are the strings themselves.
+#     - clusters: offsets (q) of the nodes of each cluster in the members (i)
+#
+# The order of the nodes and of the successors of each node is kept, but not
+# the order of the predecessors (which follows the order of the edges).
+
+MAGIC = b'DEPGSNAP'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sII')
+_ARRAY_HEADER = struct.Struct('<c7xQ')
+
+COLUMN_STR = 'str'
+COLUMN_JSON = 'json'
+
+_NO_VALUE = object()
+
+
+def _padding(size: int) -> bytes:
+    return bytes(-size % 8)
+
+
+def _array_bytes(items: array) -> bytes:
+    if sys.byteorder != 'little':
+        items = array(items.typecode, items)
+        items.byteswap()
+    data = items.tobytes()
+    return b''.join([
+        _ARRAY_HEADER.pack(items.typecode.encode('ascii'), len(items)),
+        data, _padding(len(data))])
+
+
+def _json_value(value) -> str:
+    # The values which JSON cannot encode are written as strings
+    return json.dumps(value, default=str)
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = dict()
+        self.strings = []
+
+    def intern(self, string: str) -> int:
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string_id = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+    def arrays(self) -> Tuple[array, array]:
+        encoded = [string.encode('utf-8') for string in self.strings]
+        offsets = array('q', [0])
+        position = 0
+        for data in encoded:
+            position += len(data) + 1
+            offsets.append(position)
+        return offsets, array('B', b'\0'.join(encoded) + b'\0')
+
+
+def write_snapshot(dep_graph: DependencyGraph) -> Iterator[bytes]:
+    # The snapshot as chunks of bytes (see output.py)
+    strings = _StringTable()
+    for node in dep_graph.nodes:
+        strings.intern(node)
+    node_index = dict(strings.ids)
+    n_nodes = len(node_index)
+
+    offsets = array('q', [0])
+    targets = array('i')
+    for _, successors in dep_graph.adjacency():
+        targets.extend(map(node_index.__getitem__, successors))
+        offsets.append(len(targets))
+
+    values = dict()  # attribute name -> value of each node
+    for i, (_, attrs) in enumerate(dep_graph.nodes.items()):
+        for key, value in attrs.items():
+            if key not in values:
+                values[key] = [_NO_VALUE] * n_nodes
+            values[key][i] = value
+    columns = dict()  # attribute name -> (kind, string ids)
+    for key, column in values.items():
+        if all(isinstance(value, str) for value in column
+               if value is not _NO_VALUE):
+            kind, encode = COLUMN_STR, str
+        else:
+            kind, encode = COLUMN_JSON, _json_value
+        columns[key] = (kind, array('i', [
+            -1 if value is _NO_VALUE else strings.intern(encode(value))
+            for value in column]))
+    del values
+
+    cluster_offsets = array('q', [0])
+    members = array('i')
+    for cluster in dep_graph.clusters:
+        members.extend(node_index[node] for node in cluster.nodes
+                       if node in node_index)
+        cluster_offsets.append(len(members))
+
+    metadata = json.dumps({
+        'nodes': n_nodes,
+        'edges': len(targets),
+        'graph': dict(dep_graph.graph),
+        'columns': [[name, kind] for name, (kind, _) in columns.items()],
+        'clusters': [str(cluster.name) for cluster in dep_graph.clusters],
+    }, default=str).encode('utf-8')
+    yield b''.join([_HEADER.pack(MAGIC, VERSION, len(metadata)), metadata,
+                    _padding(_HEADER.size + len(metadata))])
+
+    for items in strings.arrays():
+        yield _array_bytes(items)
+    yield _array_bytes(offsets)
+    yield _array_bytes(targets)
+    for _, ids in columns.values():
+        yield _array_bytes(ids)
+    yield _array_bytes(cluster_offsets)
+    yield _array_bytes(members)
+
+
+class Snapshot:
+    # Content of a snapshot file: the node ids, the CSR adjacency, the
+    # attribute columns as {node index: value}, and the clusters as lists of
+    # node indexes
+    def __init__(self, graph_attrs: dict, names: List[str], offsets: array,
+                 targets: array, columns: Dict[str, Dict[int, object]],
+                 clusters: List[Tuple[str, array]]):
+        self.graph_attrs = graph_attrs
+        self.names = names
+        self.offsets = offsets
+        self.targets = targets
+        self.columns = columns
+        self.clusters = clusters
+
+    def to_graph(self, graph_class=DependencyGraph):
+        with paused_gc():
+            from_csr = getattr(graph_class, 'from_csr', None)
+            if from_csr is not None:
+                graph = from_csr(self.names, self.offsets, self.targets,
+                                 self.columns, **self.graph_attrs)
+            else:
+                graph = self._build(graph_class)
+            for name, members in self.clusters:
+                graph.clusters.add(Cluster(name, [self.names[i]
+                                                  for i in members]))
+        return graph
+
+    def _build(self, graph_class):
+        names, offsets, targets = self.names, self.offsets, self.targets
+        attrs = [dict() for _ in names]
+        for key, values in self.columns.items():
+            for i, value in values.items():
+                attrs[i][key] = value
+        graph = graph_class(**self.graph_attrs)
+        graph.add_nodes_from(zip(names, attrs))
+        graph.add_edges_from(
+            (names[u], names[v]) for u in range(len(names))
+            for v in targets[offsets[u]:offsets[u + 1]])
+        return graph
+
+
+class _Reader:
+    def __init__(self, buf):
+        self.buf = buf
+        self.position = 0
+
+    def unpack(self, fmt: struct.Struct) -> tuple:
+        if self.position + fmt.size > len(self.buf):
+            raise ValueError('truncated snapshot')
+        values = fmt.unpack_from(self.buf, self.position)
+        self.position += fmt.size
+        return values
+
+    def skip_padding(self):
+        self.position += -self.position % 8
+
+    def array(self, typecode: str) -> array:
+        actual, count = self.unpack(_ARRAY_HEADER)
+        if actual != typecode.encode('ascii'):
+            raise ValueError('expected an array of "%s", found "%s"'
+                             % (typecode, actual.decode('ascii', 'replace')))
+        items = array(typecode)
+        end = self.position + count * items.itemsize
+        if end > len(self.buf):
+            raise ValueError('truncated snapshot')
+        items.frombytes(self.buf[self.position:end])
+        if sys.byteorder != 'little':
+            items.byteswap()
+        self.position = end
+        self.skip_padding()
+        return items
+
+
+def _read_strings(reader: _Reader) -> List[str]:
+    offsets = reader.array('q')
+    blob = reader.array('B').tobytes()
+    strings = blob.decode('utf-8').split('\0')[:-1]
+    if len(strings) != len(offsets) - 1:  # Some strings have NUL bytes
+        strings = [blob[offsets[i]:offsets[i + 1] - 1].decode('utf-8')
+                   for i in range(len(offsets) - 1)]
+    return strings
+
+
+def read_snapshot(file_path: str) -> Snapshot:
+    # Raises ValueError if the file is not a snapshot of this version
+    with open(file_path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files cannot be mapped
+            raise ValueError('empty file')
+        with buf:
+            return _read_snapshot(_Reader(buf))
+
+
+def _read_snapshot(reader: _Reader) -> Snapshot:
+    magic, version, metadata_size = reader.unpack(_HEADER)
+    if magic != MAGIC:
+        raise ValueError('not a dependency graph snapshot')
+    if version != VERSION:
+        raise ValueError('snapshot version %d, expected %d'
+                         % (version, VERSION))
+    metadata = json.loads(bytes(reader.buf[
+        reader.position:reader.position + metadata_size]).decode('utf-8'))
+    reader.position += metadata_size
+    reader.skip_padding()
+
+    strings = _read_strings(reader)
+    n_nodes = metadata['nodes']
+    names = strings[:n_nodes]
+    offsets = reader.array('q')
+    targets = reader.array('i')
+    if len(offsets) != n_nodes + 1 or len(targets) != metadata['edges']:
+        raise ValueError('inconsistent adjacency arrays')
+
+    columns = dict()
+    for name, kind in metadata['columns']:
+        ids = reader.array('i')
+        if kind == COLUMN_JSON:
+            columns[name] = {i: json.loads(strings[string_id])
+                             for i, string_id in enumerate(ids)
+                             if string_id >= 0}
+        else:
+            columns[name] = {i: strings[string_id]
+                             for i, string_id in enumerate(ids)
+                             if string_id >= 0}
+
+    cluster_offsets = reader.array('q')
+    members = reader.array('i')
+    clusters = [(name, members[cluster_offsets[i]:cluster_offsets[i + 1]])
+                for i, name in enumerate(metadata['clusters'])]
+
+    return Snapshot(metadata['graph'], names, offsets, targets, columns,
+                    clusters)
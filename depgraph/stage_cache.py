@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import time
+from typing import Iterable, List
+
+from .backends.backend import BackEnd
+from .config import Config
+from .dependency_graph import DependencyGraph
+from .frontends.frontend import FrontEnd
+from .graph_cores import GRAPH_CORES
+from .middlewares.middleware import Middleware
+from .output import write_output_file
+from .pipeline import run_pipeline
+from .snapshot import VERSION, read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Cache of the graphs given by the front-end and by each stage of the
+# pipeline (see --stage-cache). Each graph is stored as a snapshot, named by
+# a hash of everything it depends on:
+#
+#  - the front-end: its option and arguments, the config keys it reads, and
+#    the size and mtime of its input files
+#  - each stage: the hash of the previous one, and the `cache_key` of the
+#    stage (its class and arguments)
+#
+# so a run starts from the graph of the longest prefix of the pipeline found
+# in the cache. The least recently used graphs are evicted once the cache is
+# larger than its maximum size.
+
+STAGES_DIR = 'stages'
+SUFFIX = '.snapshot'
+
+
+def _digest(*parts: str) -> str:
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode('utf-8', errors='surrogateescape'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def frontend_key(frontend: FrontEnd, config: Config):
+    # None if the input files of the front-end are unknown
+    files = frontend.watched_files()
+    if not files:
+        return None
+    option, frontend_class, args = config['frontend'][0]
+    parts = ['snapshot %d' % VERSION, option, frontend_class.__name__,
+             repr(args)]
+    parts.extend('%s=%r' % (key, config[key])
+                 for key in frontend.config_keys)
+    for path in sorted(files):
+        try:
+            stat = os.stat(path)
+        except OSError:  # Removed in the meantime
+            continue
+        parts.append('%s %d %d' % (path, stat.st_size, stat.st_mtime_ns))
+    return _digest(*parts)
+
+
+def stage_keys(first_key: str, plan: List[Middleware]) -> List[str]:
+    # The keys of the graphs given by the front-end, then by each stage
+    keys = [first_key]
+    for stage in plan:
+        keys.append(_digest(keys[-1], stage.cache_key()))
+    return keys
+
+
+class StageCache:
+    def __init__(self, cache_dir: str, max_bytes: int, graph_class):
+        self.path = os.path.join(cache_dir, STAGES_DIR)
+        self.max_bytes = max_bytes
+        self.graph_class = graph_class
+
+    @staticmethod
+    def from_config(config: Config):
+        return StageCache(config['cache-dir'],
+                          config['stage-cache-size'] << 20,
+                          GRAPH_CORES[config['graph-core']])
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key + SUFFIX)
+
+    def contains(self, key: str) -> bool:
+        return os.path.isfile(self._file(key))
+
+    def load(self, key: str) -> DependencyGraph:
+        # The cached graph, or None if it can't be read
+        path = self._file(key)
+        try:
+            graph = read_snapshot(path).to_graph(self.graph_class)
+            os.utime(path)  # Most recently used
+        except (OSError, ValueError) as e:
+            logger.warning('Ignoring unreadable stage cache "%s": %s',
+                           path, e)
+            return None
+        return graph
+
+    def store(self, key: str, dep_graph: DependencyGraph):
+        os.makedirs(self.path, exist_ok=True)
+        write_output_file(write_snapshot(dep_graph), self._file(key))
+
+    def evict(self):
+        if not os.path.isdir(self.path):
+            return
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        # The most recent graph is kept, even if it's larger than the cache
+        for _, entry_size, path in entries[:-1]:
+            if size <= self.max_bytes:
+                break
+            logger.debug('Evicting "%s" from the stage cache.', path)
+            os.unlink(path)
+            size -= entry_size
+
+
+def run_cached_pipeline(frontend: FrontEnd, plan: List[Middleware],
+                        backend: BackEnd, config: Config) -> Iterable:
+    # Same as `run_pipeline(frontend.get_dependency_graph(), plan, backend)`
+    # but starting from the longest prefix of the pipeline in the cache, and
+    # caching the graphs of the next stages
+    cache = StageCache.from_config(config)
+    first_key = frontend_key(frontend, config)
+    if first_key is None:
+        logger.warning('Stage cache disabled: unknown input files for the '
+                       'front-end.')
+        return run_pipeline(frontend.get_dependency_graph(), plan, backend)
+    keys = stage_keys(first_key, plan)
+
+    dep_graph = None
+    done = len(keys)
+    while dep_graph is None and done > 0:
+        done -= 1
+        if cache.contains(keys[done]):
+            start = time.perf_counter()
+            dep_graph = cache.load(keys[done])
+            if dep_graph is not None:
+                logger.info('Stage cache hit: resuming after %s, loaded in '
+                            '%.2fs.', 'the front-end' if done == 0 else
+                            'stage %d of %d' % (done, len(plan)),
+                            time.perf_counter() - start)
+    if dep_graph is None:
+        logger.info('Stage cache miss: running the front-end.')
+        dep_graph = frontend.get_dependency_graph()
+        cache.store(keys[0], dep_graph)
+        done = 0
+
+    for i in range(done, len(plan)):
+        logger.info('Stage cache miss for stage %d of %d: %s', i + 1,
+                    len(plan), plan[i].middleware_name)
+        dep_graph = plan[i].transform(dep_graph)
+        cache.store(keys[i + 1], dep_graph)
+    cache.evict()
+    return backend.convert_chunks(dep_graph)
@@ -1,8 +1,10 @@
-import os
+import gc
 import random
-import re
 import typing
-from collections import OrderedDict, MutableSet, Callable
+from collections import OrderedDict, deque
+from collections.abc import MutableSet, Callable
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 
 class OrderedSet(MutableSet, typing.Set):
@@ -75,7 +77,7 @@ class DefaultOrderedDict(OrderedDict):
             args = tuple()
         else:
             args = self.default_factory,
-        return type(self), args, None, None, self.items()
+        return type(self), args, None, None, iter(self.items())
 
     def copy(self):
         return self.__copy__()
@@ -100,20 +102,48 @@ def random_hex_color():
     return '#{}'.format(''.join(map(lambda i: format(i, '02X'), [r, g, b])))
 
 
-def get_all_files_ending_with(base_path, endings, filter_regex_str=None):
-    result = []
-
-    compiled_path_regex = None
-    if filter_regex_str:
-        compiled_path_regex = re.compile(filter_regex_str)
-
-    for path, _, files in sorted(os.walk(base_path)):
-        for f in sorted(files):
-            absolute_path = os.path.abspath(path)
-            absolute_file_path = "/".join((absolute_path, f))
-            if (compiled_path_regex
-                    and not compiled_path_regex.search(absolute_file_path)):
-                continue
-            if any(f.endswith(ending) for ending in endings):
-                result.append(absolute_file_path)
-    return result
+# Like `map`, but spread over `jobs` threads, or over `jobs` processes for
+# CPU bound work (`func` and the items must then be picklable). Results keep
+# the order of `items`, so callers see exactly what the sequential version
+# returns.
+def parallel_map(func, items, jobs=1, processes=False):
+    items = list(items)
+    if jobs is None or jobs <= 1 or len(items) <= 1:
+        return list(map(func, items))
+    if processes:
+        # Send the items by batches, to amortize the inter-process overhead
+        chunksize = max(1, len(items) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(func, items, chunksize=chunksize))
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(func, items))
+
+
+# Like `parallel_map` over processes, but lazy: the results are yielded in
+# order as they come, with at most `2 * jobs` items sent ahead.
+def parallel_imap(func, items, jobs=1):
+    if jobs is None or jobs <= 1:
+        yield from map(func, items)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# Pause the cyclic garbage collector, e.g. while walking a large graph: the
+# walk allocates many short-lived containers, which trigger collections that
+# go through all the (long-lived) objects of the graph again and again.
+@contextmanager
+def paused_gc():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
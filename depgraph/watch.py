@@ -0,0 +1,112 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, List
+
+from .backends.backend import BackEnd
+from .config import Config
+from .dependency_graph import DependencyGraph
+from .frontends.frontend import FrontEnd
+from .middlewares.middleware import Middleware
+from .output import write_output_file
+from .pipeline import run_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class FileWatcher:
+    # Detects added, modified and removed files by polling their size and
+    # mtime. The files to watch are listed again on each poll, to see the
+    # new ones.
+    def __init__(self, list_files: Callable[[], List[str]]):
+        self.list_files = list_files
+        self.stamps = OrderedDict()
+
+    def poll(self):
+        stamps = OrderedDict()
+        for path in self.list_files():
+            try:
+                stat = os.stat(path)
+            except OSError:  # Removed in the meantime
+                continue
+            stamps[path] = (stat.st_size, stat.st_mtime_ns)
+
+        changed_files = [path for path, stamp in stamps.items()
+                         if self.stamps.get(path) != stamp]
+        removed_files = [path for path in self.stamps if path not in stamps]
+        self.stamps = stamps
+        return list(stamps), changed_files, removed_files
+
+
+def _render(dep_graph: DependencyGraph, middlewares: List[Middleware],
+            backend: BackEnd, output_file: str):
+    # The middlewares work on a view of the graph, to keep the one of the
+    # front-end intact for the next updates.
+    try:
+        output = run_pipeline(dep_graph, middlewares, backend, views=True)
+        write_output_file(output, output_file)
+    except (SystemExit, Exception) as e:
+        logger.error('The pipeline failed (%s), waiting for the next '
+                     'change...', _describe_error(e))
+        logger.debug('Pipeline error:', exc_info=True)
+        return
+    logger.info('Wrote %s.', output_file)
+
+
+def _describe_error(error: BaseException) -> str:
+    if isinstance(error, SystemExit):
+        return 'exit status %s' % error.code
+    return '%s: %s' % (type(error).__name__, error)
+
+
+def _get_dependency_graph(frontend: FrontEnd, dep_graph, files: List[str],
+                          changed_files: List[str],
+                          removed_files: List[str]):
+    # Returns the updated graph, or None if the front-end failed. Without a
+    # previous graph (e.g. the previous update failed), it is rebuilt.
+    try:
+        if dep_graph is None:
+            return frontend.get_dependency_graph()
+        return frontend.update_dependency_graph(
+            dep_graph, files, changed_files, removed_files)
+    except (SystemExit, Exception) as e:
+        logger.error('The front-end failed (%s), waiting for the next '
+                     'change...', _describe_error(e))
+        logger.debug('Front-end error:', exc_info=True)
+        return None
+
+
+def watch(frontend: FrontEnd, middlewares: List[Middleware],
+          backend: BackEnd, config: Config):
+    output_file = config['output-file']
+    interval = config['watch-interval']
+
+    watcher = FileWatcher(frontend.watched_files)
+    files, _, _ = watcher.poll()
+    if not files:
+        logger.warning('The front-end has no file to watch.')
+    dep_graph = _get_dependency_graph(frontend, None, files, files, [])
+    if dep_graph is not None:
+        _render(dep_graph, middlewares, backend, output_file)
+
+    logger.info('Watching %d files, press Ctrl-C to stop.', len(files))
+    try:
+        while True:
+            time.sleep(interval)
+            try:
+                files, changed_files, removed_files = watcher.poll()
+            except OSError as e:
+                logger.error('Cannot list the files to watch: %s', e)
+                continue
+            if not changed_files and not removed_files:
+                continue
+
+            logger.info('%d files changed, %d files removed.',
+                        len(changed_files), len(removed_files))
+            dep_graph = _get_dependency_graph(
+                frontend, dep_graph, files, changed_files, removed_files)
+            if dep_graph is not None:
+                _render(dep_graph, middlewares, backend, output_file)
+    except KeyboardInterrupt:
+        logger.info('Stopped watching.')
@@ -0,0 +1,53 @@
+import pytest
+
+from depgraph.dependency_graph import DependencyGraph
+from depgraph.middlewares import ClusterRegex, ClusterRegexFile
+
+
+def _graph():
+    graph = DependencyGraph()
+    for node in ('src/a/x', 'src/a/y', 'src/b/x', 'src/b/y', 'lib/c'):
+        graph.add_node(node, pretty_name=node)
+    graph.add_edges_from([('src/a/x', 'src/a/y'), ('src/a/x', 'src/b/x'),
+                          ('src/b/y', 'src/b/x'), ('lib/c', 'src/a/y')])
+    return graph
+
+
+def test_cluster_regex():
+    graph = ClusterRegex(None, ['^src/a', 'c$']).transform(_graph())
+    cluster, = graph.clusters
+    assert list(cluster.nodes) == ['src/a/x', 'src/a/y', 'lib/c']
+    assert list(cluster.edges(graph)) == [('src/a/x', 'src/a/y'),
+                                   ('lib/c', 'src/a/y')]
+
+
+def test_cluster_regex_file(tmp_path):
+    path = tmp_path / 'clusters'
+    path.write_text('# Theories\n'
+                    'b (src)/(b)/\n'
+                    '\n'
+                    'a src/[a-z]/x\n'
+                    'lib ^lib/\n'
+                    'none ^none\n')
+    graph = ClusterRegexFile(None, [str(path)]).transform(_graph())
+    assert [(c.name, list(c.nodes), list(c.edges(graph))) for c in graph.clusters] \
+        == [('b', ['src/b/x', 'src/b/y'], [('src/b/y', 'src/b/x')]),
+            ('a', ['src/a/x'], []),
+            ('lib', ['lib/c'], [])]
+
+
+def test_cluster_regex_file_errors(tmp_path):
+    path = tmp_path / 'clusters'
+    path.write_text('a ^src\nb (src\n')
+    with pytest.raises(SystemExit):
+        ClusterRegexFile(None, [str(path)])
+
+
+def test_clusters_follow_removals():
+    graph = ClusterRegex(None, ['^src/a', 'c$']).transform(_graph())
+    copy = graph.copy()
+    graph.remove_node('src/a/x')
+    graph.remove_nodes_from(['lib/c', 'missing'])
+    cluster, = graph.clusters
+    assert list(cluster) == ['src/a/y']
+    assert list(next(iter(copy.clusters))) == ['src/a/x', 'src/a/y', 'lib/c']
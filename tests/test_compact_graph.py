@@ -0,0 +1,78 @@
+import pickle
+
+import pytest
+
+from depgraph.compact_graph import CompactDependencyGraph
+from depgraph.dependency_graph import DependencyGraph
+
+EDGES = [('a', 'b'), ('a', 'c'), ('b', 'c'), ('d', 'a'), ('c', 'e'),
+         ('a', 'b'), ('e', 'c')]
+
+
+def _build(cls):
+    graph = cls()
+    graph.add_node('z', pretty_name='Z')
+    for u, v in EDGES:
+        graph.add_edge(u, v)
+    graph.add_node('a', pretty_name='A', color='red')
+    return graph
+
+
+def _dump(graph):
+    return ([(n, dict(attrs)) for n, attrs in graph.nodes.items()],
+            [(n, list(graph.adj[n]), list(graph.pred[n]))
+             for n in graph.nodes])
+
+
+def test_same_as_networkx():
+    graph = _build(CompactDependencyGraph)
+    expected = _build(DependencyGraph)
+    assert _dump(graph) == _dump(expected)
+    assert graph.number_of_edges() == expected.number_of_edges()
+    assert list(graph.edges()) == list(expected.edges())
+    assert graph.descendants('d') == expected.descendants('d')
+    assert graph.ancestors('c') == expected.ancestors('c')
+
+
+def test_removals_same_as_networkx():
+    graph = _build(CompactDependencyGraph)
+    expected = _build(DependencyGraph)
+    for g in (graph, expected):
+        g.remove_node('c')
+        g.remove_edges_from([('a', 'b'), ('x', 'y')])
+        g.add_edge('a', 'c')
+        g.add_edge('b', 'a')
+        g.nodes['b']['color'] = 'blue'
+    assert _dump(graph) == _dump(expected)
+    assert 'e' in graph and 'x' not in graph
+    with pytest.raises(Exception):
+        graph.remove_node('x')
+
+
+def test_first_query_after_removals():
+    # That query compacts the edge arrays
+    graph = CompactDependencyGraph()
+    graph.add_edges_from([('x', 'y'), ('x', 'z'), ('w', 'v')])
+    graph.remove_edge('x', 'y')
+    graph.add_edge('w', 'x')
+    assert [v for v in graph.succ['w']] == ['v', 'x']
+    assert graph.has_edge('w', 'x')
+
+
+def test_copy_and_pickle_are_independent():
+    graph = _build(CompactDependencyGraph)
+    copy = graph.copy()
+    copy.remove_node('a')
+    copy.nodes['z']['pretty_name'] = 'changed'
+    assert _dump(graph) == _dump(_build(DependencyGraph))
+
+    unpickled = pickle.loads(pickle.dumps(copy))
+    assert _dump(unpickled) == _dump(copy)
+    assert 'color' not in unpickled.nodes['b']
+
+
+def test_networkx_conversions():
+    graph = _build(CompactDependencyGraph)
+    assert _dump(graph.to_networkx()) == _dump(graph)
+    assert _dump(CompactDependencyGraph.from_networkx(
+        graph.to_networkx())) == _dump(graph)
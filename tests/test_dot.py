@@ -0,0 +1,50 @@
+import logging
+import random
+
+from depgraph.backends import dot
+from depgraph.backends.dot import DotBackEnd
+from depgraph.dependency_graph import Cluster, DependencyGraph
+
+
+def _graph(n: int) -> DependencyGraph:
+    rng = random.Random(0)
+    graph = DependencyGraph()
+    for i in range(n):
+        if i % 7:
+            graph.add_node('node%d' % i, pretty_name='Node "%d"\\' % i)
+        else:
+            graph.add_node('node%d' % i)
+    for _ in range(3 * n):
+        graph.add_edge('node%d' % rng.randrange(n), 'node%d' % rng.randrange(n))
+    graph.clusters.add(Cluster('odd', ['node%d' % i for i in range(1, n, 2)]))
+    return graph
+
+
+def _convert(graph: DependencyGraph, jobs: int) -> str:
+    random.seed(0)
+    backend = DotBackEnd({'dot-horizontal': False, 'dot-jobs': jobs}, None)
+    chunks = list(backend.convert_chunks(graph))
+    assert all(chunk.endswith('\n') for chunk in chunks)
+    return ''.join(chunks)
+
+
+def test_escaped_labels(caplog):
+    graph = _graph(20)
+    with caplog.at_level(logging.WARNING):
+        text = _convert(graph, 1)
+    assert 'n1[label="Node \\"1\\"\\\\"]\n' in text
+    assert 'n7[label="node7"]\n' in text
+    # One warning for all the nodes without "pretty_name"
+    warnings = [r for r in caplog.records if 'pretty_name' in r.getMessage()]
+    assert len(warnings) == 1
+    assert 'for 3 nodes' in warnings[0].getMessage()
+
+
+def test_jobs_give_the_same_output(monkeypatch):
+    monkeypatch.setattr(dot, 'BATCH_SIZE', 10)
+    graph = _graph(100)
+    text = _convert(graph, 1)
+    assert _convert(graph, 3) == text
+    random.seed(0)
+    backend = DotBackEnd({'dot-horizontal': False, 'dot-jobs': 1}, None)
+    assert ''.join('%s\n' % line for line in backend.convert(graph)) == text
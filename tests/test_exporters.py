@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+from xml.etree import ElementTree
+
+import pytest
+
+from depgraph.backends import CsvBackEnd, GraphMLBackEnd, NdjsonBackEnd
+from depgraph.compact_graph import CompactDependencyGraph
+from depgraph.dependency_graph import Cluster, DependencyGraph
+
+NODES = [
+    ('a', {'pretty_name': 'A "1"', 'long_name': 'dir/a', 'color': 'red'}),
+    ('b,c', {'pretty_name': 'B\nC\x01'}),
+    ('<d>', {}),
+]
+EDGES = [('a', 'b,c'), ('a', '<d>'), ('<d>', 'b,c')]
+
+
+@pytest.fixture(params=[DependencyGraph, CompactDependencyGraph])
+def graph(request):
+    graph = request.param()
+    for node, attrs in NODES:
+        graph.add_node(node, **attrs)
+    graph.add_edges_from(EDGES)
+    graph.clusters.add(Cluster('x', ['a', '<d>']))
+    graph.clusters.add(Cluster('y', ['a']))
+    return graph
+
+
+def _output(backend, graph) -> str:
+    return ''.join(backend.convert_chunks(graph))
+
+
+def test_ndjson(graph):
+    records = [json.loads(line) for line in
+               _output(NdjsonBackEnd(None, None), graph).splitlines()]
+    assert records[0] == {'type': 'node', 'id': 'a', 'long_name': 'dir/a',
+                          'pretty_name': 'A "1"', 'color': 'red',
+                          'clusters': ['x', 'y']}
+    assert records[1]['pretty_name'] == 'B\nC\x01'
+    assert records[2]['long_name'] is None
+    assert [(r['source'], r['target']) for r in records[3:]] == EDGES
+
+
+def test_csv(graph):
+    edges = list(csv.reader(io.StringIO(
+        _output(CsvBackEnd({'csv-table': 'edges'}, None), graph))))
+    assert edges == [['source', 'target']] + [list(e) for e in EDGES]
+    nodes = list(csv.reader(io.StringIO(
+        _output(CsvBackEnd({'csv-table': 'nodes'}, None), graph))))
+    assert nodes[0] == ['id', 'long_name', 'pretty_name', 'color',
+                        'clusters']
+    assert nodes[1] == ['a', 'dir/a', 'A "1"', 'red', 'x;y']
+    assert nodes[2] == ['b,c', '', 'B\nC\x01', '', '']
+
+
+def test_graphml(graph):
+    root = ElementTree.fromstring(
+        _output(GraphMLBackEnd(None, None), graph).encode('utf-8'))
+    ns = {'g': 'http://graphml.graphdrawing.org/xmlns'}
+    nodes = root.findall('g:graph/g:node', ns)
+    assert [node.get('id') for node in nodes] == [node for node, _ in NODES]
+    assert {data.get('key'): data.text for data in nodes[0]} == {
+        'pretty_name': 'A "1"', 'long_name': 'dir/a', 'color': 'red',
+        'clusters': 'x;y'}
+    assert {data.get('key'): data.text for data in nodes[1]} == {
+        'pretty_name': 'B\nC\ufffd'}
+    assert [(edge.get('source'), edge.get('target')) for edge
+            in root.findall('g:graph/g:edge', ns)] == EDGES
@@ -0,0 +1,38 @@
+from depgraph.frontends.hol4_thydata import _read_theory_data_file
+
+
+def _write(tmp_path, content: bytes, name='fooTheory.dat'):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_theorems_and_dependencies(tmp_path):
+    path = _write(tmp_path, b'''(theory
+ (core-data (name "foo") (parents "bar"))
+ (term-table (app 1 2) "not a (theorem")
+ (theorems
+  ("a_thm" (dep ((foo 1) (bar 3 4) (foo 2))) (tags "DISK_THM"))
+  ("b_def" (dep ((foo 2))) (concl 12))))
+''')
+    data = _read_theory_data_file(path)
+    assert data.theory == 'foo'
+    assert data.thms == [
+        ('a_thm', 1, [('bar', [3, 4]), ('foo', [2])]),
+        ('b_def', 2, []),
+    ]
+
+
+def test_string_table_after_theorems(tmp_path):
+    path = _write(tmp_path, b'''(theory
+ (theorems ("x\\"y" (dep ((0 7) (1 2)))))
+ (string-table "foo" "bar"))
+''')
+    data = _read_theory_data_file(path)
+    assert data.thms == [('x"y', 7, [('bar', [2])])]
+
+
+def test_empty_and_truncated_files(tmp_path):
+    assert _read_theory_data_file(_write(tmp_path, b'')).thms == []
+    path = _write(tmp_path, b'(theory (theorems ("a" (dep ((foo 1)))) ("b"')
+    assert _read_theory_data_file(path).thms == [('a', 1, [])]
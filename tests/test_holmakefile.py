@@ -0,0 +1,52 @@
+import os
+
+from depgraph.file_index import FileIndex
+from depgraph.frontends.holmakefile import (
+    find_build_directories, read_includes)
+
+NON_UNIQUE_NAMES = os.path.join(os.path.dirname(__file__),
+                                'hol4', 'non_unique_names')
+
+
+def _write(path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def test_read_includes(tmp_path):
+    path = tmp_path / 'Holmakefile'
+    _write(path, 'INCLUDES = a b \\\n'
+                 '           c # d\n'
+                 'PRE_INCLUDES += e $(HOLDIR)/examples\n'
+                 'OPTIONS = QUIT_ON_FAILURE\n'
+                 '# INCLUDES = f\n')
+    assert read_includes(str(path)) == ['a', 'b', 'c', 'e']
+
+
+def test_find_build_directories():
+    root = os.path.abspath(NON_UNIQUE_NAMES)
+    assert find_build_directories(NON_UNIQUE_NAMES) == [
+        root] + [os.path.join(root, d) for d in ('dir1', 'dir2', 'dir3',
+                                                 'dir4')]
+
+
+def test_find_build_directories_skips_outside_and_missing(tmp_path):
+    _write(tmp_path / 'root' / 'Holmakefile', 'INCLUDES = a missing ../out')
+    _write(tmp_path / 'root' / 'a' / 'Holmakefile', 'INCLUDES = .. b')
+    _write(tmp_path / 'root' / 'a' / 'b' / 'Holmakefile', '')
+    _write(tmp_path / 'root' / 'unused' / 'Holmakefile', '')
+    (tmp_path / 'out').mkdir()
+    root = str(tmp_path / 'root')
+    assert find_build_directories(root, jobs=2) == [
+        root, os.path.join(root, 'a'), os.path.join(root, 'a', 'b')]
+
+
+def test_file_index_of_directories(tmp_path):
+    for name in ('a/xScript.uo', 'a/b/yScript.uo', 'c/zScript.uo'):
+        _write(tmp_path / name, '')
+    index = FileIndex(str(tmp_path), ['.uo'],
+                      directories=[str(tmp_path / 'a' / 'b'),
+                                   str(tmp_path / 'a')])
+    assert index.files('.uo') == [str(tmp_path / 'a' / 'xScript.uo'),
+                                  str(tmp_path / 'a' / 'b' / 'yScript.uo')]
+    assert not index.contains_dir(str(tmp_path / 'a'))
@@ -0,0 +1,83 @@
+from xml.etree import ElementTree
+
+import numpy as np
+import pytest
+
+from depgraph.backends import LayeredSvgBackEnd
+from depgraph.compact_graph import CompactDependencyGraph
+from depgraph.dependency_graph import Cluster, DependencyGraph
+from depgraph.layout import layered_layout, rank_nodes
+
+SVG = '{http://www.w3.org/2000/svg}'
+
+
+@pytest.fixture(params=[DependencyGraph, CompactDependencyGraph])
+def graph(request):
+    # a -> b -> d, a -> c -> d, e -> d, and the cluster {b, c}
+    graph = request.param()
+    for node in 'abcde':
+        graph.add_node(node, pretty_name=node.upper())
+    graph.nodes['d']['color'] = 'red'
+    graph.add_edges_from([('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd'),
+                          ('e', 'd')])
+    graph.clusters.add(Cluster('x<', ['b', 'c']))
+    return graph
+
+
+def test_rank_dag(graph):
+    layout = layered_layout(graph, list(graph.nodes))
+    rank = dict(zip(layout.names, layout.rank.tolist()))
+    assert rank == {'a': 0, 'b': 1, 'c': 1, 'd': 2, 'e': 1}
+
+
+def test_rank_cycle():
+    # 0 -> 1 -> 2 -> 0, and 2 -> 3
+    rank = rank_nodes(4, np.array([0, 1, 2, 2]), np.array([1, 2, 0, 3]))
+    assert sorted(rank.tolist()[:3]) == [0, 1, 2]
+    assert rank[3] == rank[2] + 1
+
+
+def test_order_and_coordinates(graph):
+    layout = layered_layout(graph, list(graph.nodes))
+    for layer in range(int(layout.rank.max()) + 1):
+        in_layer = layout.rank == layer
+        assert sorted(layout.order[in_layer].tolist()) == \
+            list(range(in_layer.sum()))
+        # The boxes don't overlap
+        xs = np.sort(layout.x[in_layer])
+        assert np.all(np.diff(xs) >= layout.widths[0])
+    assert np.all(layout.x >= 0) and np.all(layout.x <= layout.width)
+
+
+def test_clusters_contiguous():
+    # The nodes of the cluster have their dependents far apart, but stay
+    # next to each other
+    graph = DependencyGraph()
+    graph.add_edges_from([('r0', 'n0'), ('r1', 'n1'), ('r2', 'n2'),
+                          ('r3', 'n3'), ('r0', 'n1')])
+    graph.clusters.add(Cluster('c', ['n0', 'n3']))
+    layout = layered_layout(graph, list(graph.nodes))
+    order = dict(zip(layout.names, layout.order.tolist()))
+    assert abs(order['n0'] - order['n3']) == 1
+
+
+def test_svg(graph):
+    backend = LayeredSvgBackEnd({'layout-sweeps': 4}, None)
+    root = ElementTree.fromstring('\n'.join(backend.convert(graph))
+                                  .encode('utf-8'))
+    nodes = root.findall('./%sg[@class="nodes"]/%sg' % (SVG, SVG))
+    assert [node.find(SVG + 'title').text for node in nodes] == list('abcde')
+    assert [node.find(SVG + 'text').text for node in nodes] == list('ABCDE')
+    assert nodes[3].find(SVG + 'rect').get('style') == 'fill:red'
+    assert nodes[0].find(SVG + 'rect').get('style') is None
+    assert len(root.findall('./%sg[@class="edges"]/%spath'
+                            % (SVG, SVG))) == 5
+    clusters = root.findall('./%sg[@class="clusters"]/%stext' % (SVG, SVG))
+    assert [text.text for text in clusters] == ['x<']
+
+
+def test_svg_empty():
+    backend = LayeredSvgBackEnd({'layout-sweeps': 4}, None)
+    root = ElementTree.fromstring('\n'.join(backend.convert(
+        DependencyGraph())).encode('utf-8'))
+    assert root.get('width') == '0pt'
@@ -0,0 +1,63 @@
+import gzip
+import lzma
+import os
+
+import pytest
+
+from depgraph.output import chunks_of_lines, write_output_file
+
+
+def _lines():
+    for i in range(50000):
+        yield 'n%d -> n%d' % (i, i + 1)
+
+
+def _expected():
+    return ''.join('%s\n' % line for line in _lines())
+
+
+def test_chunks_of_lines():
+    chunks = list(chunks_of_lines(_lines()))
+    assert len(chunks) > 0
+    assert all(chunk.endswith('\n') for chunk in chunks)
+    assert ''.join(chunks) == _expected()
+    assert list(chunks_of_lines([])) == []
+
+
+@pytest.mark.parametrize('name, read', [
+    ('out.dot', lambda path: open(path, 'rb').read()),
+    ('out.dot.gz', lambda path: gzip.open(path, 'rb').read()),
+    ('out.dot.xz', lambda path: lzma.open(path, 'rb').read()),
+])
+def test_write_output_file(tmp_path, name, read):
+    path = str(tmp_path / name)
+    write_output_file(chunks_of_lines(_lines()), path)
+    assert read(path).decode('utf-8') == _expected()
+    assert os.listdir(str(tmp_path)) == [name]
+
+
+def test_write_output_file_mode(tmp_path):
+    path = tmp_path / 'out.dot'
+    umask = os.umask(0o022)
+    try:
+        write_output_file(['a\n'], str(path))
+        assert path.stat().st_mode & 0o777 == 0o644
+        path.chmod(0o600)
+        write_output_file(['b\n'], str(path))
+        assert path.stat().st_mode & 0o777 == 0o600
+    finally:
+        os.umask(umask)
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path):
+    path = tmp_path / 'out.dot'
+    path.write_text('previous\n')
+
+    def failing():
+        yield 'a\n'
+        raise RuntimeError()
+
+    with pytest.raises(RuntimeError):
+        write_output_file(failing(), str(path))
+    assert path.read_text() == 'previous\n'
+    assert os.listdir(str(tmp_path)) == ['out.dot']
@@ -0,0 +1,124 @@
+import random
+
+from depgraph.compact_graph import CompactDependencyGraph
+from depgraph.dependency_graph import DependencyGraph
+from depgraph.graph_view import DependencyGraphView
+from depgraph.middlewares import (
+    HighlightDependenciesOf, HighlightDependentsOf, HighlightLeafs,
+    HighlightRoots, KeepOnlyDependenciesOf, KeepOnlyDependentsOf,
+    RemoveDependenciesOf, RemoveDependentsOf, RemoveLeafs, RemoveRoots,
+    TransitiveReduction)
+from depgraph.middlewares.middleware import peel_layers
+from depgraph.pipeline import FusedStage, describe_plan, plan_pipeline
+
+
+def _random_graph(seed):
+    rng = random.Random(seed)
+    graph = DependencyGraph()
+    for i in range(30):
+        graph.add_node('n%d' % i, pretty_name='n%d' % i)
+    for _ in range(45):
+        graph.add_edge('n%d' % rng.randrange(30), 'n%d' % rng.randrange(30))
+    return graph
+
+
+def _random_middlewares(seed, graph):
+    rng = random.Random(seed)
+    nodes = list(graph.nodes)
+    colors = ['red', 'blue']
+    makers = [
+        lambda: HighlightDependenciesOf(None, [rng.choice(nodes),
+                                               rng.choice(colors)]),
+        lambda: HighlightDependentsOf(None, [rng.choice(nodes),
+                                             rng.choice(colors)]),
+        lambda: HighlightLeafs(None, [rng.choice(colors)],
+                               depth=rng.randrange(1, 4)),
+        lambda: HighlightRoots(None, [rng.choice(colors)],
+                               depth=rng.randrange(1, 4)),
+        lambda: KeepOnlyDependenciesOf(None, [nodes[0]]),
+        lambda: KeepOnlyDependentsOf(None, [nodes[-1]]),
+        lambda: RemoveDependenciesOf(None, [rng.choice(nodes)]),
+        lambda: RemoveDependentsOf(None, [rng.choice(nodes)]),
+        lambda: RemoveLeafs(None, [rng.choice(nodes)],
+                            depth=rng.randrange(1, 4)),
+        lambda: RemoveRoots(None, [], depth=rng.randrange(1, 4)),
+    ]
+    return [rng.choice(makers)() for _ in range(rng.randrange(2, 6))]
+
+
+def _dump(graph):
+    return [(n, dict(attrs), list(graph.adj[n]))
+            for n, attrs in graph.nodes.items()]
+
+
+def _run(graph, middlewares):
+    try:
+        for middleware in middlewares:
+            graph = middleware.transform(graph)
+    except SystemExit:
+        return 'exit'
+    return _dump(graph)
+
+
+def test_fused_stages_give_the_same_graph():
+    for seed in range(200):
+        graph = _random_graph(seed)
+        middlewares = _random_middlewares(seed, graph)
+        plan = plan_pipeline(middlewares)
+        assert len(plan) == 1 and isinstance(plan[0], FusedStage)
+        assert _run(graph.copy(), plan) == _run(graph.copy(), middlewares)
+
+
+def test_views_give_the_same_graph():
+    for seed in range(100):
+        graph = _random_graph(seed)
+        compact = CompactDependencyGraph.from_networkx(graph)
+        before = _dump(graph)
+        middlewares = _random_middlewares(seed, graph)
+        middlewares.append(TransitiveReduction(None, []))
+        expected = _run(graph.copy(), middlewares)
+        for base in (graph, compact):
+            assert _run(DependencyGraphView(base), middlewares) == expected
+            assert _run(DependencyGraphView(base),
+                        plan_pipeline(middlewares)) == expected
+            # Views of views
+            view = DependencyGraphView(base)
+            if _run(view, middlewares[:2]) != 'exit':
+                assert _run(DependencyGraphView(view), middlewares[2:]) == \
+                    expected
+            assert _dump(base) == before
+
+
+def test_overwritten_highlights_are_dropped():
+    leafs_red = HighlightLeafs(None, ['red'])
+    roots = HighlightRoots(None, ['blue'])
+    leafs_green = HighlightLeafs(None, ['green'])
+    remove_roots = RemoveRoots(None, [])
+    leafs_pink = HighlightLeafs(None, ['pink'])
+    plan = plan_pipeline([leafs_red, roots, leafs_green, remove_roots,
+                          leafs_pink])
+    assert plan[0].middlewares == [roots, leafs_green, remove_roots,
+                                   leafs_pink]
+    assert plan[0].dropped == [leafs_red]
+    assert describe_plan(plan)[1].endswith('(dropped: overwritten by a '
+                                           'later stage)')
+
+
+def test_peel_layers():
+    graph = DependencyGraph()
+    graph.add_edges_from([('a', 'b'), ('b', 'c'), ('b', 'd'), ('d', 'd'),
+                          ('e', 'd'), ('f', 'g'), ('g', 'f')])
+    assert peel_layers(graph, set(), 1) == {'c', 'd'}
+    assert peel_layers(graph, set(), 2) == {'b', 'c', 'd', 'e'}
+    assert peel_layers(graph, set(), 5) == {'a', 'b', 'c', 'd', 'e'}
+    assert peel_layers(graph, set(), 5, keep_ids=['c']) == {'d', 'e'}
+    assert peel_layers(graph, {'a'}, 2, reverse=True) == {'b', 'c', 'e', 'd'}
+
+
+def test_depth_peels_like_repeated_stages():
+    for seed in range(50):
+        graph = _random_graph(seed)
+        assert _run(graph.copy(), [RemoveLeafs(None, [], depth=3)]) == \
+            _run(graph.copy(), [RemoveLeafs(None, [])] * 3)
+        assert _run(graph.copy(), [RemoveRoots(None, ['n1'], depth=2)]) == \
+            _run(graph.copy(), [RemoveRoots(None, ['n1'])] * 2)
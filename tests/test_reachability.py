@@ -0,0 +1,48 @@
+import random
+
+import networkx as nx
+
+from depgraph.compact_graph import CompactDependencyGraph
+from depgraph.dependency_graph import DependencyGraph
+from depgraph.reachability import ReachabilityIndex
+
+
+def _random_edges(n, m, seed):
+    rng = random.Random(seed)
+    return [('n%d' % rng.randrange(n), 'n%d' % rng.randrange(n))
+            for _ in range(m)]
+
+
+def test_same_as_networkx():
+    for seed in range(20):
+        expected = nx.DiGraph(_random_edges(40, 60, seed))
+        index = ReachabilityIndex.of_networkx(expected)
+        for node in expected:
+            assert index.descendants(node) == nx.descendants(expected, node)
+            assert index.ancestors(node) == nx.ancestors(expected, node)
+
+
+def test_memoized_results_are_reused():
+    graph = nx.DiGraph(_random_edges(30, 50, 1))
+    index = ReachabilityIndex.of_networkx(graph)
+    nodes = list(graph)
+    for node in reversed(nodes):  # Fill the memo first
+        index.descendants(node)
+    for node in nodes:
+        assert index.descendants(node) == nx.descendants(graph, node)
+
+
+def test_index_is_rebuilt_after_changes():
+    for cls in (DependencyGraph, CompactDependencyGraph):
+        graph = cls()
+        graph.add_edge('a', 'b')
+        graph.add_edge('b', 'c')
+        assert graph.descendants('a') == {'b', 'c'}
+        graph.remove_edge('b', 'c')
+        assert graph.descendants('a') == {'b'}
+        graph.add_edge('c', 'a')
+        assert graph.ancestors('a') == {'c'}
+        graph.remove_node('c')
+        graph.add_edge('b', 'a')
+        assert graph.descendants('a') == {'b'}
+        assert graph.ancestors('b') == {'a'}
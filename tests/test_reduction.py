@@ -0,0 +1,67 @@
+import random
+
+import networkx as nx
+import pytest
+
+from depgraph.compact_graph import CompactDependencyGraph
+from depgraph.dependency_graph import Cluster, DependencyGraph
+from depgraph.middlewares import CondenseCycles, TransitiveReduction
+from depgraph.utils import OrderedSet
+
+
+def _random_dag(seed):
+    rng = random.Random(seed)
+    graph = DependencyGraph()
+    for i in range(30):
+        graph.add_node('n%d' % i, pretty_name='n%d' % i)
+    for _ in range(80):
+        a, b = sorted(rng.sample(range(30), 2))
+        graph.add_edge('n%d' % a, 'n%d' % b)
+    return graph
+
+
+def _edges(graph):
+    return set((u, v) for u in graph.nodes for v in graph.succ[u])
+
+
+@pytest.mark.parametrize('core', [DependencyGraph.copy,
+                                  CompactDependencyGraph.from_networkx])
+def test_transitive_reduction(core):
+    for seed in range(50):
+        graph = _random_dag(seed)
+        expected = _edges(nx.transitive_reduction(nx.DiGraph(graph)))
+        graph = core(graph)
+        graph.clusters = OrderedSet([Cluster('cluster', ['n3', 'n5'])])
+        reduced = TransitiveReduction(None, []).transform(graph)
+        assert type(reduced) is type(graph)
+        assert _edges(reduced) == expected
+        assert reduced.nodes['n3'] == {'pretty_name': 'n3'}
+        assert [list(c) for c in reduced.clusters] == [['n3', 'n5']]
+
+
+def test_transitive_reduction_of_a_cyclic_graph():
+    graph = _random_dag(0)
+    graph.add_edge('n29', 'n0')
+    with pytest.raises(SystemExit):
+        TransitiveReduction(None, []).transform(graph)
+
+
+@pytest.mark.parametrize('core', [DependencyGraph.copy,
+                                  CompactDependencyGraph.from_networkx])
+def test_condense_cycles(core):
+    graph = DependencyGraph()
+    for node in 'abcdef':
+        graph.add_node(node, pretty_name=node.upper())
+    graph.add_edges_from([('a', 'b'), ('b', 'c'), ('c', 'b'), ('c', 'd'),
+                          ('d', 'b'), ('d', 'e'), ('e', 'e'), ('f', 'c')])
+    graph = core(graph)
+    graph.clusters = OrderedSet([Cluster('cluster', ['d'])])
+
+    condensed = CondenseCycles(None, []).transform(graph)
+    assert _edges(condensed) == {('a', 'b'), ('b', 'e'), ('f', 'b')}
+    assert condensed.nodes['b'] == {'pretty_name': 'B (+2)',
+                                    'members': ['b', 'c', 'd']}
+    assert [list(c) for c in condensed.clusters] == [['b']]
+
+    reduced = TransitiveReduction(None, []).transform(condensed)
+    assert _edges(reduced) == {('a', 'b'), ('b', 'e'), ('f', 'b')}
@@ -0,0 +1,85 @@
+from depgraph.frontends.hol4_thms import _scan_sml_file
+from depgraph.frontends.sml_lexer import (
+    code_lines, tokenize, TOKEN_CODE, TOKEN_STRING, TOKEN_NEWLINE)
+
+
+def _write(tmp_path, content: bytes, name='testScript.sml'):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_plain_lines(tmp_path):
+    path = _write(tmp_path, b'val a = 1\nval b = 2\n')
+    assert list(code_lines(path)) == ['val a = 1', 'val b = 2']
+
+
+def test_empty_file(tmp_path):
+    path = _write(tmp_path, b'')
+    assert list(tokenize(path)) == []
+    assert list(code_lines(path)) == []
+
+
+def test_comment_is_removed(tmp_path):
+    path = _write(tmp_path, b'val a (* comment *) = 1\n')
+    assert list(code_lines(path)) == ['val a  = 1']
+
+
+def test_nested_comments(tmp_path):
+    path = _write(tmp_path, b'a (* x (* y *) val b = prove *) c\n')
+    assert list(code_lines(path)) == ['a  c']
+
+
+def test_multi_line_comment_joins_lines(tmp_path):
+    path = _write(tmp_path, b'before (* one\ntwo\n*) after\nnext\n')
+    assert list(code_lines(path)) == ['before  after', 'next']
+
+
+def test_comment_start_in_string(tmp_path):
+    path = _write(tmp_path, b'val s = "(* not a comment" ^ x\n')
+    assert list(tokenize(path)) == [
+        (TOKEN_CODE, 'val s = '),
+        (TOKEN_STRING, '"(* not a comment"'),
+        (TOKEN_CODE, ' ^ x'),
+        (TOKEN_NEWLINE, '\n'),
+    ]
+
+
+def test_escaped_quote_in_string(tmp_path):
+    path = _write(tmp_path, b'val s = "a \\" (* b" (* c *)\n')
+    assert list(code_lines(path)) == ['val s = "a \\" (* b" ']
+
+
+def test_char_literal(tmp_path):
+    path = _write(tmp_path, b'val c = #"(" (* comment *) val d = #")"\n')
+    assert list(code_lines(path)) == ['val c = #"("  val d = #")"']
+
+
+def test_unterminated_comment(tmp_path):
+    path = _write(tmp_path, b'val a = 1\nval b (* never closed\nval c\n')
+    assert list(code_lines(path)) == ['val a = 1', 'val b ']
+
+
+def test_unterminated_string(tmp_path):
+    path = _write(tmp_path, b'val s = "never closed (* x *)')
+    assert list(tokenize(path)) == [
+        (TOKEN_CODE, 'val s = '),
+        (TOKEN_STRING, '"never closed (* x *)'),
+    ]
+
+
+def test_crlf_new_lines(tmp_path):
+    path = _write(tmp_path, b'val a = 1\r\nval b = "x"\r\nval c\rval d\n')
+    assert list(code_lines(path)) == [
+        'val a = 1', 'val b = "x"', 'val c', 'val d']
+
+
+def test_crlf_dependencies_are_found(tmp_path):
+    path = _write(tmp_path, b'val a_thm = store_thm("a_thm", ``T``,\r\n'
+                            b'  rw[b_thm\r\n'
+                            b'  ]);\r\n')
+    scan = _scan_sml_file(path)
+    assert scan.thm_names == ['a_thm']
+    (thm_id, words), = scan.sections
+    assert thm_id == 'a_thm'
+    assert 'b_thm' in words
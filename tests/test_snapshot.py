@@ -0,0 +1,68 @@
+import pytest
+
+from depgraph.compact_graph import CompactDependencyGraph
+from depgraph.dependency_graph import Cluster, DependencyGraph
+from depgraph.graph_view import DependencyGraphView
+from depgraph.output import write_output_file
+from depgraph.snapshot import read_snapshot, write_snapshot
+
+EDGES = [('a', 'b'), ('a', 'c'), ('b', 'c'), ('d', 'a'), ('c', 'e'),
+         ('e', 'c'), ('c', 'c')]
+
+
+def _build(cls):
+    graph = cls()
+    graph.add_node('z', pretty_name='Z \0 "z"')
+    for u, v in EDGES:
+        graph.add_edge(u, v)
+    graph.add_node('a', pretty_name='A', color='#FF0000')
+    graph.add_node('é', pretty_name='a', members=['é', 'x'], size=3)
+    graph.clusters.add(Cluster('first', ['c', 'a']))
+    graph.clusters.add(Cluster('empty'))
+    return graph
+
+
+def _dump(graph):
+    # The order of the predecessors, given by the order in which the edges
+    # were added, is not kept
+    return ([(n, dict(attrs)) for n, attrs in graph.nodes.items()],
+            [(n, list(graph.adj[n]), set(graph.pred[n]))
+             for n in graph.nodes],
+            [(c.name, list(c.nodes)) for c in graph.clusters])
+
+
+@pytest.mark.parametrize('cls', [DependencyGraph, CompactDependencyGraph])
+@pytest.mark.parametrize('load_cls', [DependencyGraph,
+                                      CompactDependencyGraph])
+def test_round_trip(tmp_path, cls, load_cls):
+    graph = _build(cls)
+    path = str(tmp_path / 'graph.snapshot')
+    write_output_file(write_snapshot(graph), path)
+    loaded = read_snapshot(path).to_graph(load_cls)
+    assert isinstance(loaded, load_cls)
+    assert _dump(loaded) == _dump(graph)
+    assert loaded.descendants('d') == graph.descendants('d')
+
+
+def test_view_round_trip(tmp_path):
+    view = DependencyGraphView(_build(DependencyGraph))
+    view.remove_node('b')
+    view.nodes['c']['color'] = 'blue'
+    path = str(tmp_path / 'graph.snapshot')
+    write_output_file(write_snapshot(view), path)
+    assert _dump(read_snapshot(path).to_graph()) == _dump(view.to_graph())
+
+
+@pytest.mark.parametrize('content, message', [
+    (b'', 'empty'),
+    (b'not a snapshot at all', 'not a dependency graph snapshot'),
+    (None, 'truncated'),
+])
+def test_invalid_files(tmp_path, content, message):
+    path = str(tmp_path / 'graph.snapshot')
+    if content is None:
+        content = b''.join(write_snapshot(_build(DependencyGraph)))[:-20]
+    with open(path, 'wb') as f:
+        f.write(content)
+    with pytest.raises(ValueError, match=message):
+        read_snapshot(path)
@@ -0,0 +1,90 @@
+import logging
+import os
+import random
+
+from depgraph.backends import DotBackEnd
+from depgraph.dependency_graph import DependencyGraph
+from depgraph.frontends.frontend import FrontEnd
+from depgraph.middlewares import RemoveLeafs, RemoveRoots, TransitiveReduction
+from depgraph.stage_cache import STAGES_DIR, run_cached_pipeline
+
+
+class _FileFrontEnd(FrontEnd):
+    # Graph of the lines "u v" of a file
+    config_keys = ('graph-core',)
+
+    def __init__(self, path):
+        super().__init__('File')
+        self.path = path
+        self.calls = 0
+
+    @staticmethod
+    def install_arg_parser(parser):
+        raise NotImplementedError()
+
+    def watched_files(self):
+        return [self.path]
+
+    def get_dependency_graph(self):
+        self.calls += 1
+        graph = DependencyGraph()
+        with open(self.path) as f:
+            for line in f:
+                graph.add_edge(*line.split())
+        return graph
+
+
+def _config(tmp_path, size=1024):
+    return {'frontend': [('file', _FileFrontEnd, [])],
+            'cache-dir': str(tmp_path / 'cache'), 'stage-cache-size': size,
+            'graph-core': 'networkx', 'dot-horizontal': False, 'dot-jobs': 1}
+
+
+def _run(frontend, plan, config):
+    backend = DotBackEnd(config, None)
+    random.seed(0)
+    return ''.join(run_cached_pipeline(frontend, plan, backend, config))
+
+
+def _plan():
+    return [RemoveLeafs(None, []), TransitiveReduction(None, None)]
+
+
+def test_resume_from_longest_prefix(tmp_path, caplog):
+    path = str(tmp_path / 'edges')
+    with open(path, 'w') as f:
+        f.write('a b\nb c\na c\nc d\nd e\n')
+    config = _config(tmp_path)
+    frontend = _FileFrontEnd(path)
+    caplog.set_level(logging.INFO)
+
+    output = _run(frontend, _plan(), config)
+    assert frontend.calls == 1
+    assert len(os.listdir(str(tmp_path / 'cache' / STAGES_DIR))) == 3
+    assert _run(frontend, _plan(), config) == output
+    assert frontend.calls == 1
+    assert 'resuming after stage 2 of 2' in caplog.text
+
+    # Only the last stage changed
+    caplog.clear()
+    _run(frontend, _plan()[:1] + [RemoveRoots(None, [])], config)
+    assert frontend.calls == 1
+    assert 'resuming after stage 1 of 2' in caplog.text
+
+    # The input changed
+    with open(path, 'a') as f:
+        f.write('e f\n')
+    assert _run(frontend, _plan(), config) != output
+    assert frontend.calls == 2
+
+
+def test_eviction(tmp_path):
+    path = str(tmp_path / 'edges')
+    with open(path, 'w') as f:
+        f.write('a b\nb c\n')
+    frontend = _FileFrontEnd(path)
+    _run(frontend, _plan(), _config(tmp_path, size=0))
+    # Only the most recent graph is kept
+    assert len(os.listdir(str(tmp_path / 'cache' / STAGES_DIR))) == 1
+    _run(frontend, _plan(), _config(tmp_path, size=0))
+    assert frontend.calls == 1
@@ -0,0 +1,79 @@
+import logging
+import os
+import stat
+import sys
+from xml.etree import ElementTree
+
+import pytest
+
+from depgraph.backends import SvgBackEnd
+from depgraph.backends.svg import layout_units, pack
+from depgraph.dependency_graph import Cluster, DependencyGraph
+
+# Stands for Graphviz: draws one 10x10 box per node, in a column
+FAKE_DOT = '''#!%s
+import re
+import sys
+source = sys.stdin.read()
+nodes = re.findall(r'^(n[0-9]+)\\[', source, re.M)
+print('<?xml version="1.0"?>')
+print('<svg width="20pt" height="%%dpt" viewBox="0 0 20 %%d" '
+      'xmlns="http://www.w3.org/2000/svg">' %% (10 * len(nodes),
+                                                 10 * len(nodes)))
+for i, node in enumerate(nodes):
+    print('<g id="%%s"><rect y="%%d" width="10" height="10"/></g>'
+          %% (node, 10 * i))
+print('</svg>')
+''' % sys.executable
+
+
+def _graph():
+    graph = DependencyGraph()
+    graph.add_edges_from([('a', 'b'), ('b', 'c'), ('d', 'c'),
+                          ('e', 'f'), ('f', 'g'), ('x', 'x')])
+    graph.add_node('alone')
+    graph.clusters.add(Cluster('fg', ['f', 'g']))
+    return graph
+
+
+def test_layout_units():
+    graph = _graph()
+    assert [unit.nodes for unit in layout_units(graph)] == [
+        ['a', 'b', 'c', 'd'], ['e', 'f', 'g'], ['x'], ['alone']]
+    units = layout_units(graph, split_clusters=True)
+    assert [(unit.nodes, unit.title) for unit in units] == [
+        (['a', 'b', 'c', 'd'], None), (['e'], None), (['f', 'g'], 'fg'),
+        (['x'], None), (['alone'], None)]
+
+
+def test_pack():
+    sizes = [(10, 30), (40, 10), (10, 10), (20, 20)]
+    positions, width, height = pack(sizes, margin=0)
+    boxes = [(x, y, x + w, y + h) for (x, y), (w, h) in zip(positions, sizes)]
+    for i, a in enumerate(boxes):
+        assert a[2] <= width and a[3] <= height
+        for b in boxes[i + 1:]:
+            assert a[2] <= b[0] or b[2] <= a[0] or a[3] <= b[1] \
+                or b[3] <= a[1]
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='Needs a shebang')
+def test_render(tmp_path, caplog):
+    program = str(tmp_path / 'fake-dot')
+    with open(program, 'w') as f:
+        f.write(FAKE_DOT)
+    os.chmod(program, os.stat(program).st_mode | stat.S_IXUSR)
+    config = {'svg-program': program, 'svg-jobs': 2, 'svg-min-nodes': 2,
+              'svg-split-clusters': False, 'dot-horizontal': False}
+
+    with caplog.at_level(logging.INFO):
+        svg = ''.join(SvgBackEnd(config, None).convert_chunks(_graph()))
+    root = ElementTree.fromstring(svg)
+    ns = {'s': 'http://www.w3.org/2000/svg'}
+    drawings = root.findall('s:svg', ns)
+    # The two components of 4 and 3 nodes, but not "x" and "alone"
+    assert sorted(float(d.get('height')) for d in drawings) == [30, 40]
+    ids = [g.get('id') for g in root.iter('{http://www.w3.org/2000/svg}g')]
+    assert len(ids) == 7 and len(set(ids)) == 7
+    assert 'Skipped 2 components of fewer than 2 nodes' in caplog.text
+    assert 'component of "a" of 4 nodes and 3 edges' in caplog.text